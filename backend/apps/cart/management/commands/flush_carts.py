@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.cart.store import get_cart_store
+
+
+class Command(BaseCommand):
+    help = "Persist carts changed in the cart store to Cart / CartItem"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Flush a single batch (default: until no dirty carts are left)"
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("Flushing carts..."))
+        started = time.monotonic()
+        total = 0
+
+        while True:
+            flushed = get_cart_store().flush(batch_size=options["batch_size"])
+            total += flushed
+            # 0 — очередь пуста (или вся пачка с ошибками: ждём следующего запуска)
+            if options["once"] or not flushed:
+                break
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Carts flushed: {total} in {time.monotonic() - started:.1f}s."
+        ))
@@ -26,6 +26,18 @@ class CartItemSerializer(serializers.ModelSerializer):
 
 
 
+class CartEntrySerializer(serializers.Serializer):
+    """
+    Позиция корзины из кэширующего хранилища (dict, id = product_id).
+    """
+    id = serializers.IntegerField()
+    product = serializers.IntegerField()
+    product_name = serializers.CharField()
+    product_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    quantity = serializers.IntegerField()
+
+
+
 class CartSerializer(serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
 
@@ -43,8 +55,6 @@ class AddToCartSerializer(serializers.Serializer):
     quantity = serializers.IntegerField(min_value=1, default=1)
 
     def validate(self, attrs):
-        request = self.context["request"]
-        user = request.user
         product = attrs["product"]
         quantity = attrs["quantity"]
 
@@ -60,18 +70,8 @@ class AddToCartSerializer(serializers.Serializer):
                 {"quantity": f"Only {product.stock} items available in stock"}
             )
 
-        # 3. Проверяем существующее количество в корзине
-        existing_qty = (
-            CartItem.objects
-            .filter(cart__user=user, product=product)
-            .values_list("quantity", flat=True)
-            .first() or 0
-        )
-
-        if existing_qty + quantity > product.stock:
-            raise serializers.ValidationError(
-                {"quantity": f"Total quantity exceeds stock ({product.stock})"}
-            )
+        # 3. Уже лежащее в корзине + quantity проверяет хранилище
+        # атомарно при добавлении (см. store.py)
 
         return attrs
 
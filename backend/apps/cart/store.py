@@ -0,0 +1,520 @@
+"""
+Хранилище корзины (CART_STORE_BACKEND, см. get_cart_store()).
+
+- DatabaseCartStore — Cart / CartItem, как раньше (по умолчанию);
+- RedisCartStore — корзина = hash cart:{user_id} {product_id: quantity};
+  add / update / remove атомарны в Redis (Lua), проверка остатка — там же;
+- LocalCartStore — то же в памяти процесса (тесты, dev без Redis).
+
+Кэширующие хранилища пишут в БД отложенно (write-behind): изменённые
+корзины попадают в множество «грязных», команда flush_carts переписывает
+их в Cart / CartItem. Пустой hash подгружается из БД (ключ вытеснен /
+корзина ещё не в кэше), поэтому flush не затирает несброшенное.
+Checkout (OrderService.create_order) читает корзину из хранилища —
+оно источник правды.
+
+В кэширующем режиме позиция адресуется товаром: "id" позиции = product_id
+(на него же ссылается item_id в /cart/update/ и /cart/remove/),
+"id" корзины — None (строка Cart создаётся при сбросе).
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.module_loading import import_string
+
+from apps.products.models import Product
+from .models import Cart, CartItem
+from .serializers import CartEntrySerializer, CartSerializer
+
+logger = logging.getLogger(__name__)
+
+# поле-маркер hash: корзина загружена (пустая корзина != нет в кэше)
+LOADED_FIELD = "_"
+
+
+class CartLimitExceeded(Exception):
+    """
+    Итоговое количество товара в корзине больше остатка.
+    """
+
+
+class BaseCartStore:
+    def get_cart(self, user):
+        """
+        Представление корзины для CartView.
+        """
+        raise NotImplementedError
+
+    def add(self, user, product, quantity):
+        """
+        +quantity к позиции; CartLimitExceeded — если итог больше product.stock.
+        """
+        raise NotImplementedError
+
+    def update_item(self, user, item_id, quantity):
+        """
+        False — позиции нет.
+        """
+        raise NotImplementedError
+
+    def remove_item(self, user, item_id):
+        raise NotImplementedError
+
+    def checkout_items(self, user):
+        """
+        {product_id: quantity} — актуальное состояние для оформления заказа.
+        Вызывается в транзакции checkout, до блокировки товаров.
+        """
+        raise NotImplementedError
+
+    def consume(self, user, items):
+        """
+        Вызывается в транзакции checkout: убирает оформленные позиции.
+        """
+        raise NotImplementedError
+
+    def flush(self, batch_size=500):
+        """
+        Сбрасывает изменённые корзины в БД, возвращает их число.
+        """
+        return 0
+
+
+class DatabaseCartStore(BaseCartStore):
+
+    def get_cart(self, user):
+        try:
+            cart = Cart.objects.prefetch_related(
+                "items__product"  # Двойное подчеркивание протаскивает join дальше
+            ).get(user=user)
+        except Cart.DoesNotExist:
+            try:
+                with transaction.atomic():
+                    cart = Cart.objects.create(user=user)
+            except IntegrityError:
+                # корзину создал параллельный запрос
+                cart = Cart.objects.prefetch_related(
+                    "items__product"
+                ).get(user=user)
+
+        return CartSerializer(cart).data
+
+    def add(self, user, product, quantity):
+        cart, _ = Cart.objects.get_or_create(user=user)
+
+        with transaction.atomic():
+            item, created = CartItem.objects.select_for_update().get_or_create(
+                cart=cart,
+                product=product,
+                defaults={"quantity": 0},
+            )
+            # под блокировкой строки — параллельные add не обойдут остаток
+            if item.quantity + quantity > product.stock:
+                raise CartLimitExceeded()
+            item.quantity += quantity
+            item.save(update_fields=["quantity"])
+        return item.quantity
+
+    def update_item(self, user, item_id, quantity):
+        return CartItem.objects.filter(id=item_id, cart__user=user).update(quantity=quantity) > 0
+
+    def remove_item(self, user, item_id):
+        deleted, _ = CartItem.objects.filter(id=item_id, cart__user=user).delete()
+        return deleted > 0
+
+    def checkout_items(self, user):
+        # строки корзины заблокированы до коммита заказа: параллельный
+        # checkout ждёт и видит уже убранные consume() позиции
+        return dict(
+            CartItem.objects
+            .select_for_update()
+            .filter(cart__user=user)
+            .order_by("product_id")
+            .values_list("product_id", "quantity")
+        )
+
+    def consume(self, user, items):
+        CartItem.objects.filter(cart__user=user, product_id__in=list(items)).delete()
+
+
+class CachedCartStore(BaseCartStore):
+    """
+    Общая логика кэширующих хранилищ. Примитивы (_read, _load, _add, ...)
+    реализуют Redis / локальный вариант; _read → None, _add / _set / _remove
+    → NOT_LOADED, если корзины нет в кэше.
+    """
+
+    NOT_LOADED = object()
+
+    def timeout(self):
+        return getattr(settings, "CART_STORE_TIMEOUT", 60 * 60 * 24 * 30)
+
+    # ---- примитивы ----
+    def _read(self, user_id):
+        raise NotImplementedError
+
+    def _load(self, user_id, items):
+        """
+        Кладёт корзину из БД, только если её ещё нет в кэше.
+        """
+        raise NotImplementedError
+
+    def _add(self, user_id, product_id, quantity, limit):
+        """
+        Новое количество, -1 — превышен limit.
+        """
+        raise NotImplementedError
+
+    def _set(self, user_id, product_id, quantity):
+        """
+        True — позиция была и обновлена.
+        """
+        raise NotImplementedError
+
+    def _remove(self, user_id, product_id):
+        raise NotImplementedError
+
+    def _subtract(self, user_id, items):
+        raise NotImplementedError
+
+    def _pop_dirty(self, count):
+        raise NotImplementedError
+
+    def _mark_dirty(self, user_ids):
+        raise NotImplementedError
+
+    # ---- загрузка из БД ----
+    def _load_from_db(self, user_id):
+        items = dict(
+            CartItem.objects
+            .filter(cart__user_id=user_id)
+            .values_list("product_id", "quantity")
+        )
+        self._load(user_id, items)
+
+    def _call(self, primitive, user_id, *args):
+        result = primitive(user_id, *args)
+        if result is self.NOT_LOADED:
+            self._load_from_db(user_id)
+            result = primitive(user_id, *args)
+        return result
+
+    def _items(self, user_id):
+        items = self._read(user_id)
+        if items is None:
+            self._load_from_db(user_id)
+            items = self._read(user_id) or {}
+        return items
+
+    def _drop_missing(self, user_id, items, existing):
+        """
+        Товары удалены (в БД CartItem ушёл бы каскадом) — убираем
+        их позиции и из кэша, иначе checkout падал бы на них всегда.
+        """
+        missing = set(items) - set(existing)
+        for product_id in missing:
+            self._remove(user_id, product_id)
+            items.pop(product_id)
+        return items
+
+    # ---- API ----
+    def get_cart(self, user):
+        items = self._items(user.id)
+        products = {
+            row["id"]: row
+            for row in Product.objects.filter(pk__in=list(items)).values("id", "name", "price")
+        }
+        self._drop_missing(user.id, items, products)
+        entries = [
+            {
+                "id": product_id,
+                "product": product_id,
+                "product_name": products[product_id]["name"],
+                "product_price": products[product_id]["price"],
+                "quantity": quantity,
+            }
+            for product_id, quantity in sorted(items.items())
+        ]
+        return {"id": None, "items": CartEntrySerializer(entries, many=True).data}
+
+    def add(self, user, product, quantity):
+        result = self._call(self._add, user.id, product.pk, quantity, product.stock)
+        if result < 0:
+            raise CartLimitExceeded()
+        return result
+
+    def update_item(self, user, item_id, quantity):
+        return bool(self._call(self._set, user.id, item_id, quantity))
+
+    def remove_item(self, user, item_id):
+        return bool(self._call(self._remove, user.id, item_id))
+
+    def checkout_items(self, user):
+        items = dict(self._items(user.id))
+        existing = Product.objects.filter(pk__in=list(items)).values_list("id", flat=True)
+        return self._drop_missing(user.id, items, existing)
+
+    def consume(self, user, items):
+        # копия в БД — в той же транзакции, что и заказ
+        CartItem.objects.filter(cart__user=user, product_id__in=list(items)).delete()
+        user_id, items = user.id, dict(items)
+
+        def subtract():
+            # заказ уже закоммичен — ошибка кэша не должна превращать его в 500;
+            # лишние позиции останутся в корзине до следующей правки
+            try:
+                self._subtract(user_id, items)
+            except Exception:
+                logger.exception("cart_consume_failed", extra={"user_id": user_id})
+
+        # вычитаем оформленное, а не очищаем: позиции, добавленные
+        # во время checkout, остаются
+        transaction.on_commit(subtract)
+
+    def flush(self, batch_size=500):
+        user_ids = self._pop_dirty(batch_size)
+        failed = []
+        for user_id in user_ids:
+            try:
+                self.persist(user_id)
+            except Exception:
+                logger.exception("cart_flush_failed", extra={"user_id": user_id})
+                failed.append(user_id)
+        if failed:
+            self._mark_dirty(failed)
+        return len(user_ids) - len(failed)
+
+    def persist(self, user_id):
+        """
+        Переписывает Cart / CartItem пользователя по состоянию кэша.
+        """
+        items = self._read(user_id)
+        if items is None:
+            # вытеснен после сброса — в БД актуальная копия
+            return
+
+        with transaction.atomic():
+            cart, _ = Cart.objects.get_or_create(user_id=user_id)
+            CartItem.objects.filter(cart=cart).exclude(product_id__in=list(items)).delete()
+            existing = Product.objects.filter(pk__in=list(items)).values_list("id", flat=True)
+            self._drop_missing(user_id, items, existing)
+            CartItem.objects.bulk_create(
+                [
+                    CartItem(cart=cart, product_id=product_id, quantity=quantity)
+                    for product_id, quantity in items.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["cart", "product"],
+                update_fields=["quantity"],
+            )
+
+
+class LocalCartStore(CachedCartStore):
+    """
+    Корзины в памяти процесса — для тестов и dev без Redis.
+    flush_carts из другого процесса их не видит.
+    """
+
+    def __init__(self):
+        self._carts = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def _read(self, user_id):
+        with self._lock:
+            items = self._carts.get(user_id)
+            return None if items is None else dict(items)
+
+    def _load(self, user_id, items):
+        with self._lock:
+            self._carts.setdefault(user_id, dict(items))
+
+    def _add(self, user_id, product_id, quantity, limit):
+        with self._lock:
+            items = self._carts.get(user_id)
+            if items is None:
+                return self.NOT_LOADED
+            new = items.get(product_id, 0) + quantity
+            if new > limit:
+                return -1
+            items[product_id] = new
+            self._dirty.add(user_id)
+            return new
+
+    def _set(self, user_id, product_id, quantity):
+        with self._lock:
+            items = self._carts.get(user_id)
+            if items is None:
+                return self.NOT_LOADED
+            if product_id not in items:
+                return False
+            items[product_id] = quantity
+            self._dirty.add(user_id)
+            return True
+
+    def _remove(self, user_id, product_id):
+        with self._lock:
+            items = self._carts.get(user_id)
+            if items is None:
+                return self.NOT_LOADED
+            if items.pop(product_id, None) is None:
+                return False
+            self._dirty.add(user_id)
+            return True
+
+    def _subtract(self, user_id, subtract):
+        with self._lock:
+            items = self._carts.get(user_id)
+            if items is None:
+                return
+            for product_id, quantity in subtract.items():
+                left = items.get(product_id, 0) - quantity
+                if left > 0:
+                    items[product_id] = left
+                else:
+                    items.pop(product_id, None)
+            self._dirty.add(user_id)
+
+    def _pop_dirty(self, count):
+        with self._lock:
+            user_ids = [self._dirty.pop() for _ in range(min(count, len(self._dirty)))]
+        return user_ids
+
+    def _mark_dirty(self, user_ids):
+        with self._lock:
+            self._dirty.update(user_ids)
+
+
+# KEYS[1] — hash корзины, KEYS[2] — множество грязных; ARGV[1] — user_id, ARGV[2] — TTL
+_ADD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return -2 end
+local new = tonumber(redis.call('HGET', KEYS[1], ARGV[3]) or '0') + tonumber(ARGV[4])
+if new > tonumber(ARGV[5]) then return -1 end
+redis.call('HSET', KEYS[1], ARGV[3], new)
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[1])
+return new
+"""
+
+_SET_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return -2 end
+if redis.call('HEXISTS', KEYS[1], ARGV[3]) == 0 then return 0 end
+redis.call('HSET', KEYS[1], ARGV[3], ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[1])
+return 1
+"""
+
+_REMOVE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return -2 end
+if redis.call('HDEL', KEYS[1], ARGV[3]) == 0 then return 0 end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[1])
+return 1
+"""
+
+# ARGV[3..] — пары product_id, quantity
+_SUBTRACT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+for i = 3, #ARGV, 2 do
+    local left = redis.call('HINCRBY', KEYS[1], ARGV[i], -tonumber(ARGV[i + 1]))
+    if left <= 0 then redis.call('HDEL', KEYS[1], ARGV[i]) end
+end
+redis.call('SADD', KEYS[2], ARGV[1])
+return 1
+"""
+
+# пустой словарь не создаёт hash — маркер LOADED_FIELD держит ключ
+_LOAD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then return 0 end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+class RedisCartStore(CachedCartStore):
+    """
+    Соединение — из django-redis (CART_STORE_REDIS_ALIAS, по умолчанию кэш "default").
+    """
+
+    DIRTY_KEY = "cart:dirty"
+
+    def __init__(self):
+        # импорт здесь: django-redis есть только в prod
+        from django_redis import get_redis_connection
+
+        self.client = get_redis_connection(getattr(settings, "CART_STORE_REDIS_ALIAS", "default"))
+        self.scripts = {
+            name: self.client.register_script(source)
+            for name, source in (
+                ("add", _ADD_SCRIPT),
+                ("set", _SET_SCRIPT),
+                ("remove", _REMOVE_SCRIPT),
+                ("subtract", _SUBTRACT_SCRIPT),
+                ("load", _LOAD_SCRIPT),
+            )
+        }
+
+    @staticmethod
+    def key(user_id):
+        return f"cart:{user_id}"
+
+    def _run(self, name, user_id, *args):
+        result = self.scripts[name](
+            keys=[self.key(user_id), self.DIRTY_KEY],
+            args=[user_id, self.timeout(), *args],
+        )
+        return self.NOT_LOADED if result == -2 else result
+
+    def _read(self, user_id):
+        raw = self.client.hgetall(self.key(user_id))
+        if not raw:
+            return None
+        return {
+            int(field): int(value)
+            for field, value in raw.items()
+            if field.decode() != LOADED_FIELD
+        }
+
+    def _load(self, user_id, items):
+        pairs = [LOADED_FIELD, 1]
+        for product_id, quantity in items.items():
+            pairs.extend((product_id, quantity))
+        self.scripts["load"](keys=[self.key(user_id)], args=[self.timeout(), *pairs])
+
+    def _add(self, user_id, product_id, quantity, limit):
+        return self._run("add", user_id, product_id, quantity, limit)
+
+    def _set(self, user_id, product_id, quantity):
+        return self._run("set", user_id, product_id, quantity)
+
+    def _remove(self, user_id, product_id):
+        return self._run("remove", user_id, product_id)
+
+    def _subtract(self, user_id, items):
+        pairs = []
+        for product_id, quantity in items.items():
+            pairs.extend((product_id, quantity))
+        self._run("subtract", user_id, *pairs)
+
+    def _pop_dirty(self, count):
+        return [int(user_id) for user_id in self.client.spop(self.DIRTY_KEY, count) or []]
+
+    def _mark_dirty(self, user_ids):
+        if user_ids:
+            self.client.sadd(self.DIRTY_KEY, *user_ids)
+
+
+_store = None
+
+
+def get_cart_store():
+    global _store
+    if _store is None:
+        path = getattr(settings, "CART_STORE_BACKEND", None)
+        store_class = import_string(path) if path else DatabaseCartStore
+        _store = store_class()
+    return _store
@@ -2,33 +2,18 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
-from .models import Cart, CartItem
-from .serializers import CartSerializer, AddToCartSerializer, UpdateCartItemSerializer, RemoveCartItemSerializer
+from rest_framework.exceptions import NotFound, ValidationError
+from .serializers import AddToCartSerializer, UpdateCartItemSerializer, RemoveCartItemSerializer
+from .store import CartLimitExceeded, get_cart_store
 from apps.products.models import Product
-from django.shortcuts import get_object_or_404
-from django.db import transaction, IntegrityError
 
 
 class CartView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        try:
-            cart = Cart.objects.prefetch_related(
-                "items__product"  # Двойное подчеркивание протаскивает join дальше
-            ).get(user=request.user)
-        except Cart.DoesNotExist:
-            try:
-                with transaction.atomic():
-                    cart = Cart.objects.create(user=request.user)
-            except IntegrityError:
-                # корзину создал параллельный запрос
-                cart = Cart.objects.prefetch_related(
-                    "items__product"
-                ).get(user=request.user)
-
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        # Cart / CartItem или кэш — см. CART_STORE_BACKEND
+        return Response(get_cart_store().get_cart(request.user))
 
 
 
@@ -42,16 +27,12 @@ class AddToCartView(APIView):
         product: Product = serializer.validated_data["product"]
         quantity: int = serializer.validated_data["quantity"]
 
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-
-        with transaction.atomic():
-            item, created = CartItem.objects.select_for_update().get_or_create(
-                cart=cart,
-                product=product,
-                defaults={"quantity": 0},
+        try:
+            get_cart_store().add(request.user, product, quantity)
+        except CartLimitExceeded:
+            raise ValidationError(
+                {"quantity": f"Total quantity exceeds stock ({product.stock})"}
             )
-            item.quantity += quantity
-            item.save(update_fields=["quantity"])
 
         return Response({'message': 'Added to cart'}, status=status.HTTP_201_CREATED)
 
@@ -69,15 +50,9 @@ class UpdateCartItemView(APIView):
         item_id = serializer.validated_data["item_id"]
         quantity = serializer.validated_data["quantity"]
 
-        item = get_object_or_404(
-             CartItem, id=item_id, cart__user=request.user )
+        if not get_cart_store().update_item(request.user, item_id, quantity):
+            raise NotFound()
 
-        if quantity <= 0:
-            item.delete()
-            return Response({'message': 'Item removed'})
-
-        item.quantity = quantity
-        item.save()
         return Response({'message': 'Quantity updated'})
 
 
@@ -93,14 +68,7 @@ class RemoveFromCartView(APIView):
 
         item_id = serializer.validated_data["item_id"]
 
-        item = get_object_or_404(
-            CartItem,
-            id=item_id,
-            cart__user=request.user
-        )
-
-        item.delete()
+        if not get_cart_store().remove_item(request.user, item_id):
+            raise NotFound()
 
         return Response({'message': 'Item removed'})
-
-
@@ -0,0 +1,92 @@
+import time
+
+from django.core.cache import cache
+
+
+def _version_key(name):
+    return f"version:{name}"
+
+
+def _initial_version():
+    # не 1: если ключ версии вытеснили, новая версия не совпадёт со старыми записями
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    """
+    Текущий номер версии для группы кэш-ключей.
+    """
+    return cache.get_or_set(_version_key(name), _initial_version, timeout=None)
+
+
+def get_versions(names):
+    """
+    Версии нескольких групп (тегов) за один get_many.
+    """
+    keys = {_version_key(name): name for name in names}
+    found = cache.get_many(keys)
+
+    versions = {}
+    for key, name in keys.items():
+        if key in found:
+            versions[name] = found[key]
+        else:
+            versions[name] = get_version(name)
+    return versions
+
+
+def bump_version(name):
+    """
+    Инвалидация группы: все ключи старой версии просто перестают читаться
+    и вытесняются по TTL.
+    """
+    key = _version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # ключа нет (вытеснен / холодный кэш)
+        cache.add(key, _initial_version(), timeout=None)
+        return cache.incr(key)
+
+
+def bump_versions(names):
+    for name in set(names):
+        bump_version(name)
+
+
+def versioned_key(name, *parts):
+    suffix = ":".join(str(p) for p in parts)
+    key = f"{name}:v{get_version(name)}"
+    return f"{key}:{suffix}" if suffix else key
+
+
+def get_tagged_entry(key):
+    """
+    {"tags", "value", "stored_at"} записи set_tagged, если ни один из её тегов
+    не был инвалидирован; иначе None.
+    """
+    entry = cache.get(key)
+    if entry is None or "stored_at" not in entry:
+        return None
+
+    stored = entry["tags"]
+    if get_versions(stored) != stored:
+        return None
+    return entry
+
+
+def get_tagged(key):
+    entry = get_tagged_entry(key)
+    return None if entry is None else entry["value"]
+
+
+def set_tagged(key, value, versions, timeout):
+    """
+    Сохраняет значение вместе с версиями тегов.
+    versions (см. get_versions) снимаются ДО вычисления value —
+    тогда инвалидация во время вычисления не даст закэшировать старые данные.
+    stored_at (unix time) годится для Last-Modified.
+    """
+    entry = {"tags": versions, "value": value, "stored_at": int(time.time())}
+    cache.set(key, entry, timeout=timeout)
+    return entry
@@ -0,0 +1,34 @@
+import hashlib
+import json
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """
+    Строгий ETag из метаданных (версии кэша, ключи), а не из тела ответа.
+    """
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def conditional_response(request, etag, last_modified, build):
+    """
+    304 по If-None-Match / If-Modified-Since без вызова build(),
+    иначе build() с заголовками ETag и Last-Modified.
+    last_modified — unix timestamp (секунды).
+    """
+    not_modified = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+    )
+    if not_modified is not None:
+        return not_modified
+
+    response = build()
+    if response.status_code == 200:
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+    return response
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.orders.services import PurchaseService
+
+
+class Command(BaseCommand):
+    help = "Recompute purchased products (review eligibility) from delivered and completed orders"
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("Rebuilding purchased products..."))
+        started = time.monotonic()
+        rows = PurchaseService.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Purchased products rebuilt: {rows} rows in {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.1 on 2026-10-17 17:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_purchased_products(apps, schema_editor):
+    OrderItem = apps.get_model("orders", "OrderItem")
+    PurchasedProduct = apps.get_model("orders", "PurchasedProduct")
+
+    pairs = (
+        OrderItem.objects
+        .filter(order__status__in=["delivered", "completed"])
+        .values_list("order__user_id", "product_id")
+        .distinct()
+        .order_by()
+    )
+    PurchasedProduct.objects.bulk_create(
+        (PurchasedProduct(user_id=user_id, product_id=product_id) for user_id, product_id in pairs),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+        ('products', '0014_product_stars'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchasedProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchased_products', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'product'), name='unique_user_purchased_product')],
+            },
+        ),
+        migrations.RunPython(fill_purchased_products, migrations.RunPython.noop),
+    ]
@@ -146,3 +146,34 @@ class OrderStatusHistory(models.Model):
 
     def __str__(self):
         return f"{self.order.id}: {self.from_status} → {self.to_status}"
+
+
+class PurchasedProduct(models.Model):
+    """
+    Материализованное «пользователь купил товар»: заказ дошёл до
+    DELIVERED / COMPLETED. Ведётся в OrderService.change_status,
+    читается через PurchaseService (право на отзыв).
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="purchased_products",
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # заодно индекс для выборки по пользователю
+            models.UniqueConstraint(
+                fields=["user", "product"],
+                name="unique_user_purchased_product",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.product_id}"
@@ -1,11 +1,16 @@
-from django.db import transaction, IntegrityError
+from array import array
+from bisect import bisect_left
+from django.db import connection, transaction, IntegrityError
 from django.core.exceptions import ValidationError
-from .models import Order, OrderItem, OrderStatusHistory
-from apps.cart.models import CartItem
+from .models import Order, OrderItem, OrderStatusHistory, PurchasedProduct
+from apps.common.cache import bump_versions, get_tagged, get_versions, set_tagged
+from apps.cart.store import get_cart_store
 from apps.products.models import Product
+from apps.products.services import CoPurchaseService
 import logging
 from decimal import Decimal
 from uuid import uuid4
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
@@ -29,20 +34,7 @@ class OrderService:
         """
         Idempotent, deadlock-safe order creation with full observability.
         """
-        # Observability: start
-        try:
-            cart_size = CartItem.objects.filter(cart__user=user).count()
-        except Exception:
-            cart_size = None
-
-        logger.info(
-            "checkout_started",
-            extra={
-                "user_id": getattr(user, "id", None),
-                "idempotency_key": idempotency_key,
-                "cart_size": cart_size,
-            },
-        )
+        cart_store = get_cart_store()
 
         try:
             with transaction.atomic():
@@ -60,15 +52,25 @@ class OrderService:
                     )
                     return existing, False
 
-                # 2) Получаем позиции корзины в детерминированном порядке
-                cart_items_qs = (
-                    CartItem.objects
-                    .select_related("product", "cart")
-                    .filter(cart__user=user)
-                    .order_by("product_id")   # <- важно для детерминированной блокировки
+                # 2) Корзина — из хранилища (БД или кэш, см. apps/cart/store.py):
+                # {product_id: quantity}, оно же источник правды для заказа.
+                # Читаем в транзакции: снимок, по которому списываем остатки
+                # и который потом убирает consume()
+                cart_items = cart_store.checkout_items(user)
+
+                logger.info(
+                    "checkout_started",
+                    extra={
+                        "user_id": getattr(user, "id", None),
+                        "idempotency_key": idempotency_key,
+                        "cart_size": len(cart_items),
+                    },
                 )
 
-                if not cart_items_qs.exists():
+                # Позиции корзины в детерминированном порядке
+                product_ids = sorted(cart_items)   # <- важно для детерминированной блокировки
+
+                if not product_ids:
                     logger.warning(
                         "checkout_empty_cart",
                         extra={"user_id": getattr(user, "id", None)},
@@ -76,37 +78,45 @@ class OrderService:
                     raise ValidationError("Cart is empty")
 
                 # 3) Блокируем Product-строки в детерминированном порядке (по pk)
-                product_ids = list(cart_items_qs.values_list("product_id", flat=True).distinct())
-                products_qs = Product.objects.filter(pk__in=product_ids).order_by("pk").select_for_update()
+                # category — путь для сброса кэша выдачи без запроса на товар;
+                # блокируем только строки товаров
+                products_qs = (
+                    Product.objects
+                    .filter(pk__in=product_ids)
+                    .select_related("category")
+                    .order_by("pk")
+                    .select_for_update(of=("self",))
+                )
                 products = {p.pk: p for p in products_qs}
 
                 # 4) Проверяем stock и резервируем (меняем объект и сохраняем)
                 total_price = Decimal("0")
                 order_items = []
 
-                for ci in cart_items_qs:
-                    p = products.get(ci.product_id)
+                for product_id in product_ids:
+                    quantity = cart_items[product_id]
+                    p = products.get(product_id)
                     if p is None:
                         logger.error(
                             "checkout_product_missing",
-                            extra={"product_id": ci.product_id, "user_id": getattr(user, "id", None)},
+                            extra={"product_id": product_id, "user_id": getattr(user, "id", None)},
                         )
-                        raise ValidationError(f"Product {ci.product_id} not found")
+                        raise ValidationError(f"Product {product_id} not found")
 
-                    if p.stock < ci.quantity:
+                    if p.stock < quantity:
                         logger.warning(
                             "checkout_out_of_stock",
                             extra={
                                 "product_id": p.pk,
                                 "available": p.stock,
-                                "requested": ci.quantity,
+                                "requested": quantity,
                                 "user_id": getattr(user, "id", None),
                             },
                         )
                         raise ValidationError(f"Not enough stock for product {p.pk}")
 
                     # резервируем
-                    p.stock -= ci.quantity
+                    p.stock -= quantity
                     p.save(update_fields=["stock"])
 
                     # подготовка OrderItem
@@ -115,13 +125,13 @@ class OrderService:
                             order=None,  # временно, присвоим order после создания
                             product=p,
                             product_name=p.name if hasattr(p, "name") else "",
-                            quantity=ci.quantity,
+                            quantity=quantity,
                             price=p.price,
                         )
                     )
 
                     # суммирование
-                    total_price += (p.price * ci.quantity)
+                    total_price += (p.price * quantity)
 
                 # 5) Создаём Order (после успешного резервирования)
                 try:
@@ -159,13 +169,16 @@ class OrderService:
                     oi.order = order
                 OrderItem.objects.bulk_create(order_items)
 
+                # индекс «покупают вместе» — после коммита, вне блокировок
+                CoPurchaseService.schedule_order(products.keys())
+
                 # 7) Финализируем заказ
                 # order.total_price = total_price
                 # order.is_finalized = True
                 # order.save(update_fields=["total_price", "is_finalized"])
 
-                # 8) Очищаем корзину
-                cart_items_qs.delete()
+                # 8) Убираем оформленное из корзины
+                cart_store.consume(user, cart_items)
 
                 logger.info(
                     "checkout_created",
@@ -221,6 +234,13 @@ class OrderService:
                     comment=comment,
                 )
 
+                # заказ получен — товары дают право на отзыв
+                if (
+                    new_status in PurchaseService.ELIGIBLE_STATUSES
+                    and old_status not in PurchaseService.ELIGIBLE_STATUSES
+                ):
+                    PurchaseService.record_order(order)
+
             # outside transaction: send notification (or send asynchronously inside job)
             if str(new_status).lower() == "shipped":
                 try:
@@ -255,6 +275,92 @@ class OrderService:
             raise
 
 
+class PurchaseService:
+    """
+    Купленные пользователем товары (PurchasedProduct) — для права на отзыв.
+
+    Проверка читает из кэша компактный отсортированный массив id товаров
+    пользователя (bisect), без JOIN OrderItem → Order; запись в
+    change_status поднимает версию тега пользователя после коммита.
+    """
+
+    ELIGIBLE_STATUSES = (Order.Status.DELIVERED, Order.Status.COMPLETED)
+    CACHE_TIMEOUT = 60 * 60
+    # общий тег: rebuild() сбрасывает наборы всех пользователей
+    TAG = "purchases"
+
+    @staticmethod
+    def user_tag(user_id):
+        return f"purchases:user:{user_id}"
+
+    @classmethod
+    def record_order(cls, order):
+        """
+        Вызывается в транзакции смены статуса.
+        """
+        PurchasedProduct.objects.bulk_create(
+            [
+                PurchasedProduct(user_id=order.user_id, product_id=product_id)
+                for product_id in set(order.items.values_list("product_id", flat=True))
+            ],
+            ignore_conflicts=True,
+        )
+        cls.invalidate(order.user_id)
+
+    @classmethod
+    def invalidate(cls, user_id=None):
+        tags = [cls.user_tag(user_id) if user_id is not None else cls.TAG]
+        transaction.on_commit(lambda: bump_versions(tags))
+
+    @classmethod
+    def product_ids(cls, user_id):
+        key = f"{cls.user_tag(user_id)}:products"
+        product_ids = get_tagged(key)
+        if product_ids is None:
+            # версия — до чтения из БД (см. set_tagged)
+            versions = get_versions([cls.TAG, cls.user_tag(user_id)])
+            product_ids = array("I", sorted(
+                PurchasedProduct.objects
+                .filter(user_id=user_id)
+                .values_list("product_id", flat=True)
+            ))
+            set_tagged(key, product_ids, versions, timeout=cls.CACHE_TIMEOUT)
+        return product_ids
+
+    @classmethod
+    def has_purchased(cls, user_id, product_id):
+        product_ids = cls.product_ids(user_id)
+        i = bisect_left(product_ids, product_id)
+        return i < len(product_ids) and product_ids[i] == product_id
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Полный пересчёт одним INSERT ... SELECT (после bulk-загрузки заказов).
+        """
+        pairs = (
+            OrderItem.objects
+            .filter(order__status__in=cls.ELIGIBLE_STATUSES)
+            .values("order__user_id", "product_id")
+            .distinct()
+            .order_by()
+        )
+        sql, params = pairs.query.sql_with_params()
+        table = connection.ops.quote_name(PurchasedProduct._meta.db_table)
+
+        with transaction.atomic():
+            PurchasedProduct.objects.all().delete()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} (user_id, product_id, created_at) "
+                    f"SELECT pairs.*, %s FROM ({sql}) pairs",
+                    (timezone.now(), *params),
+                )
+                created = cursor.rowcount
+            cls.invalidate()
+        return created
+
+
 class OrderStatusFlow:
 
     ALLOWED_TRANSITIONS = {
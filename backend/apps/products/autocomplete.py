@@ -0,0 +1,145 @@
+"""
+Автодополнение поиска: префиксный индекс в памяти процесса.
+
+Индекс — отсортированный массив нормализованных слов названий
+(активные товары + активные категории) со ссылками на записи;
+запрос = bisect по префиксу, без обращений к БД.
+
+Индекс пересобирается, когда меняется штамп версий
+(CATALOG_TAG + AUTOCOMPLETE_TAG): сигналы поднимают AUTOCOMPLETE_TAG при
+изменении name / slug / is_active / category товара, импорт и категории —
+CATALOG_TAG. Пока один поток пересобирает индекс, остальные отвечают
+из предыдущего.
+"""
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+from apps.common.cache import get_versions
+from .cache import CATALOG_TAG, invalidate_tags
+from .models import Category, Product
+
+AUTOCOMPLETE_TAG = "autocomplete"
+# поля товара, от которых зависит индекс (save(update_fields=...))
+INDEXED_FIELDS = {"name", "slug", "is_active", "category", "category_id"}
+MAX_CANDIDATES = 2000
+
+
+def normalize(text):
+    """
+    "Смартфон Galaxy-S24" → "смартфон galaxy s24" (регистр, диакритика, знаки)
+    """
+    text = unicodedata.normalize("NFKD", text.casefold())
+    chars = []
+    for ch in text:
+        if unicodedata.combining(ch):
+            continue
+        chars.append(ch if ch.isalnum() else " ")
+    return " ".join("".join(chars).split())
+
+
+class PrefixIndex:
+    def __init__(self, entries):
+        # entries: [(type, id, name, slug)]
+        self.entries = entries
+        self.words = []
+
+        pairs = []
+        for ref, (_, _, name, _) in enumerate(entries):
+            words = normalize(name).split()
+            self.words.append(words)
+            for word in set(words):
+                pairs.append((word, ref))
+        pairs.sort()
+
+        self.keys = [word for word, _ in pairs]
+        self.refs = array("I", (ref for _, ref in pairs))
+
+    def search(self, query, limit):
+        terms = normalize(query).split()
+        if not terms:
+            return []
+
+        # самый длинный термин — самый селективный диапазон
+        probe = max(terms, key=len)
+        start = bisect_left(self.keys, probe)
+
+        found = {}
+        for i in range(start, min(start + MAX_CANDIDATES, len(self.keys))):
+            if not self.keys[i].startswith(probe):
+                break
+            ref = self.refs[i]
+            if ref in found:
+                continue
+            words = self.words[ref]
+            # каждый термин — префикс какого-нибудь слова названия
+            if all(any(w.startswith(t) for w in words) for t in terms):
+                found[ref] = words
+
+        phrase = " ".join(terms)
+        ranked = sorted(
+            found.items(),
+            key=lambda item: (
+                self.entries[item[0]][0] != "category",
+                not " ".join(item[1]).startswith(phrase),
+                len(self.entries[item[0]][2]),
+                item[0],
+            ),
+        )
+        return [
+            {"type": kind, "id": pk, "name": name, "slug": slug}
+            for kind, pk, name, slug in (self.entries[ref] for ref, _ in ranked[:limit])
+        ]
+
+
+class AutocompleteIndex:
+    _index = None
+    _stamp = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def build():
+        entries = [
+            ("category", pk, name, slug)
+            for pk, name, slug in (
+                Category.objects
+                .filter(is_active=True)
+                .values_list("id", "name", "slug")
+            )
+        ]
+        entries.extend(
+            ("product", pk, name, slug)
+            for pk, name, slug in (
+                Product.objects
+                .filter(is_active=True)
+                .values_list("id", "name", "slug")
+                .iterator(chunk_size=5000)
+            )
+        )
+        return PrefixIndex(entries)
+
+    @classmethod
+    def get(cls):
+        stamp = get_versions([CATALOG_TAG, AUTOCOMPLETE_TAG])
+        if cls._index is not None and stamp == cls._stamp:
+            return cls._index
+
+        # пересобирает один поток, остальные — по старому индексу
+        if not cls._lock.acquire(blocking=cls._index is None):
+            return cls._index
+        try:
+            if cls._index is None or stamp != cls._stamp:
+                cls._index = cls.build()
+                cls._stamp = stamp
+        finally:
+            cls._lock.release()
+        return cls._index
+
+    @classmethod
+    def search(cls, query, limit=10):
+        return cls.get().search(query, limit)
+
+    @staticmethod
+    def invalidate():
+        invalidate_tags([AUTOCOMPLETE_TAG])
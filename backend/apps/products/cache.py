@@ -0,0 +1,146 @@
+"""
+Кэш ответов каталога (list / retrieve) с инвалидацией по тегам.
+
+Теги:
+- catalog           — глобальное поколение каталога
+- product:<id>      — конкретный товар (цена, остаток, картинки, отзывы, атрибуты)
+- category:<id>     — выдача категории и всех её потомков
+- category:all      — выдача без фильтра по категории
+
+Каждая запись хранит версии своих тегов (apps.common.cache.set_tagged);
+изменение модели поднимает версии тегов после коммита.
+Из них же строятся ETag / Last-Modified (conditional GET → 304).
+"""
+import hashlib
+
+from django.db import transaction
+from rest_framework.response import Response
+
+from apps.common.cache import bump_versions, get_tagged_entry, get_versions, set_tagged
+from apps.common.http import conditional_response, make_etag
+from .models import Category, Product
+
+CATALOG_TAG = "catalog"
+ALL_PRODUCTS_TAG = "category:all"
+RESPONSE_TIMEOUT = 60 * 10
+
+
+def product_tag(product_id):
+    return f"product:{product_id}"
+
+
+def category_tag(category_id):
+    return f"category:{category_id}"
+
+
+def category_path_tags(path):
+    """
+    "1/5/12/" → теги категории и всех предков
+    """
+    return [category_tag(pk) for pk in path.split("/") if pk]
+
+
+def invalidate_tags(tags):
+    tags = list(tags)
+    transaction.on_commit(lambda: bump_versions(tags))
+
+
+def invalidate_catalog():
+    invalidate_tags([CATALOG_TAG])
+
+
+def invalidate_product(product_id, listing=False, category_ids=(), category_paths=()):
+    """
+    listing=True — изменение влияет на состав/порядок выдачи,
+    поэтому сбрасываем и списки категорий товара (с предками).
+    category_paths — уже известные пути категорий: по ним без запроса к Category.
+    """
+    tags = [product_tag(product_id)]
+
+    if listing:
+        tags.append(ALL_PRODUCTS_TAG)
+        category_ids = set(category_ids)
+        paths = list(category_paths)
+        if not category_ids and not paths:
+            category_ids = set(
+                Product.objects
+                .filter(pk=product_id)
+                .values_list("category_id", flat=True)
+            )
+        if category_ids:
+            paths.extend(
+                Category.objects.filter(pk__in=category_ids).values_list("path", flat=True)
+            )
+        for path in paths:
+            tags.extend(category_path_tags(path))
+
+    invalidate_tags(tags)
+
+
+class ProductResponseCache:
+    """
+    Ключ = вариант (staff / public) + полный URL запроса.
+    Staff и остальные кэшируются раздельно: get_queryset различается.
+    """
+
+    @staticmethod
+    def make_key(request, action):
+        user = request.user
+        variant = "staff" if user.is_authenticated and user.is_staff else "public"
+        digest = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        return f"products:{action}:{variant}:{digest}"
+
+    @staticmethod
+    def list_tags(request):
+        tags = [CATALOG_TAG]
+
+        slug = request.query_params.get("category")
+        if slug:
+            category_id = (
+                Category.objects
+                .filter(slug=slug)
+                .values_list("id", flat=True)
+                .first()
+            )
+            tags.append(category_tag(category_id))
+        else:
+            tags.append(ALL_PRODUCTS_TAG)
+        return tags
+
+    @staticmethod
+    def detail_tags(pk):
+        return [CATALOG_TAG, product_tag(pk)]
+
+    @staticmethod
+    def cached_response(request, action, get_tags, build):
+        """
+        build() -> (response, extra_tags). Версии get_tags() снимаются до build(),
+        extra_tags (товары на странице) — после.
+        Кэшируются только 200-ответы.
+
+        ETag = ключ + версии тегов записи, Last-Modified = время её сборки:
+        при попадании в кэш 304 отдаётся без сериализации и без запросов к БД.
+        """
+        key = ProductResponseCache.make_key(request, action)
+        entry = get_tagged_entry(key)
+        if entry is not None:
+            return conditional_response(
+                request,
+                make_etag(key, entry["tags"]),
+                entry["stored_at"],
+                lambda: Response(entry["value"]),
+            )
+
+        versions = get_versions(get_tags())
+        response, extra_tags = build()
+        if response.status_code != 200:
+            return response
+
+        versions.update(get_versions(extra_tags))
+        entry = set_tagged(key, response.data, versions, timeout=RESPONSE_TIMEOUT)
+        return conditional_response(
+            request,
+            make_etag(key, versions),
+            entry["stored_at"],
+            lambda: response,
+        )
@@ -0,0 +1,113 @@
+"""
+Отложенное удаление файлов картинок.
+
+- queue_image_files() — из сигналов: строки PendingFileDeletion пишутся
+  в той же транзакции, что и удаление / замена ProductImage
+  (откат транзакции — файл остаётся).
+- process_pending() — пачка: файлы, на которые ещё ссылается ProductImage
+  (общий пул seed, повторная загрузка), пропускаются; остальные удаляются
+  параллельно; удалённые строки — одним DELETE, ошибки — attempts + 1.
+
+PRODUCT_FILE_CLEANUP_INLINE = True — разбирать очередь сразу после коммита
+(dev), иначе — командой process_file_deletions (cron / worker).
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import PendingFileDeletion, ProductImage
+
+logger = logging.getLogger(__name__)
+
+IMAGE_STORAGE = ProductImage._meta.get_field("image").storage
+MAX_ATTEMPTS = 5
+
+
+def queue_image_files(name, variants):
+    """
+    Оригинал + его производные ({"thumb_webp": name, ...}).
+    """
+    if not name:
+        return
+
+    rows = [PendingFileDeletion(name=name, source=name)]
+    rows.extend(
+        PendingFileDeletion(name=variant, source=name)
+        for variant in (variants or {}).values()
+    )
+    PendingFileDeletion.objects.bulk_create(rows)
+    _schedule_inline()
+
+
+def _schedule_inline():
+    from django.conf import settings
+
+    if getattr(settings, "PRODUCT_FILE_CLEANUP_INLINE", False):
+        transaction.on_commit(process_pending)
+
+
+def _delete(name):
+    try:
+        # FileSystemStorage / S3 сами игнорируют отсутствующий файл — без exists()
+        IMAGE_STORAGE.delete(name)
+    except Exception as exc:
+        return name, str(exc) or exc.__class__.__name__
+    return name, None
+
+
+def process_pending(batch_size=500, workers=8, max_attempts=MAX_ATTEMPTS):
+    """
+    Одна пачка очереди. Возвращает метрики {"deleted", "skipped", "failed"}.
+    """
+    started = time.monotonic()
+
+    with transaction.atomic():
+        queue = (
+            PendingFileDeletion.objects
+            .filter(attempts__lt=max_attempts)
+            .order_by("attempts", "id")
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            # параллельные воркеры берут разные пачки
+            queue = queue.select_for_update(skip_locked=True)
+        rows = list(queue.values_list("id", "name", "source")[:batch_size])
+        if not rows:
+            return {"deleted": 0, "skipped": 0, "failed": 0}
+
+        # файл снова используется (общий пул, тот же файл у другой картинки)
+        in_use = set(
+            ProductImage.objects
+            .filter(image__in={source for _, _, source in rows if source})
+            .values_list("image", flat=True)
+        )
+        skipped = [pk for pk, _, source in rows if source in in_use]
+        pending = [(pk, name) for pk, name, source in rows if source not in in_use]
+
+        names = {name for _, name in pending}
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(names) or 1))) as pool:
+            errors = {name: error for name, error in pool.map(_delete, names) if error}
+
+        done = skipped + [pk for pk, name in pending if name not in errors]
+        PendingFileDeletion.objects.filter(pk__in=done).delete()
+
+        failed = [pk for pk, name in pending if name in errors]
+        for pk, name in pending:
+            if name in errors:
+                PendingFileDeletion.objects.filter(pk=pk).update(
+                    attempts=F("attempts") + 1,
+                    last_error=errors[name][:1000],
+                )
+
+    metrics = {
+        "deleted": len(done) - len(skipped),
+        "skipped": len(skipped),
+        "failed": len(failed),
+    }
+    logger.info(
+        "file_cleanup_batch",
+        extra={**metrics, "duration_ms": int((time.monotonic() - started) * 1000)},
+    )
+    return metrics
@@ -0,0 +1,150 @@
+"""
+Потоковая выгрузка каталога (NDJSON / CSV) с постоянным расходом памяти.
+
+- iter_products() — товары через iterator(chunk_size) (на PostgreSQL —
+  server-side cursor), категория — JOIN, атрибуты — один запрос на пачку.
+- render_ndjson() / render_csv() — генераторы строк для
+  StreamingHttpResponse и команды export_products.
+
+Формат строк совместим с import_products.
+"""
+import csv
+import json
+from decimal import Decimal
+
+from django.db.models import F
+
+from .models import ProductAttribute, ProductAttributeValue
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+PRODUCT_FIELDS = [
+    "id",
+    "slug",
+    "name",
+    "category",
+    "description",
+    "price",
+    "old_price",
+    "stock",
+    "is_active",
+    "rating",
+    "reviews_count",
+    "main_image",
+    "updated_at",
+]
+
+
+def _product_rows(queryset, chunk_size):
+    return (
+        queryset
+        .order_by("id")
+        .values(
+            *[f for f in PRODUCT_FIELDS if f != "category"],
+            # имя "category" занято FK
+            category_slug=F("category__slug"),
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _attribute_values(product_ids):
+    """
+    {product_id: {attribute slug: value}} для пачки товаров одним запросом.
+    """
+    rows = (
+        ProductAttributeValue.objects
+        .filter(product_id__in=product_ids)
+        .values_list(
+            "product_id",
+            "attribute__slug",
+            "attribute__value_type",
+            "value_text",
+            "value_number",
+            "value_bool",
+        )
+    )
+
+    result = {}
+    for product_id, slug, value_type, text, number, flag in rows:
+        if value_type == ProductAttribute.NUMBER:
+            value = number
+        elif value_type == ProductAttribute.BOOLEAN:
+            value = flag
+        else:
+            value = text
+        result.setdefault(product_id, {})[slug] = value
+    return result
+
+
+def iter_products(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    dict на каждый товар: поля PRODUCT_FIELDS + "attributes".
+    """
+    chunk = []
+    for row in _product_rows(queryset, chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from _with_attributes(chunk)
+            chunk = []
+    if chunk:
+        yield from _with_attributes(chunk)
+
+
+def _with_attributes(chunk):
+    attributes = _attribute_values([row["id"] for row in chunk])
+    for row in chunk:
+        row["category"] = row.pop("category_slug")
+        yield {
+            **{f: row[f] for f in PRODUCT_FIELDS},
+            "attributes": attributes.get(row["id"], {}),
+        }
+
+
+def _to_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def render_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, default=_to_text, ensure_ascii=False) + "\n"
+
+
+class _Echo:
+    """
+    Псевдо-файл для csv.writer: write() просто возвращает строку.
+    """
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    # колонки атрибутов известны заранее — таблица атрибутов маленькая
+    attribute_slugs = list(
+        ProductAttribute.objects.order_by("slug").values_list("slug", flat=True)
+    )
+    writer = csv.writer(_Echo())
+
+    yield writer.writerow(PRODUCT_FIELDS + [f"attr.{slug}" for slug in attribute_slugs])
+    for row in rows:
+        attributes = row["attributes"]
+        yield writer.writerow(
+            [_to_text(row[f]) for f in PRODUCT_FIELDS]
+            + [_to_text(attributes.get(slug)) for slug in attribute_slugs]
+        )
+
+
+def render(rows, fmt):
+    return render_csv(rows) if fmt == "csv" else render_ndjson(rows)
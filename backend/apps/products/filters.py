@@ -1,6 +1,16 @@
+from decimal import Decimal, InvalidOperation
+
 import django_filters
-from django.db.models import Q
-from .models import Product, Category
+from django.db.models import Exists, OuterRef
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+from .models import Product, Category, ProductAttribute, ProductAttributeValue
+from .search import get_search_backend
+
+BOOL_VALUES = {
+    "true": True, "1": True, "yes": True,
+    "false": False, "0": False, "no": False,
+}
 
 
 class ProductFilter(django_filters.FilterSet):
@@ -33,27 +43,152 @@ class ProductFilter(django_filters.FilterSet):
     def filter_category(self, queryset, name, value):
         """
         value = slug категории
+
+        Товары категории и всех её потомков (любая глубина) —
+        один JOIN по префиксу materialized path.
+        Путь передаём литералом, чтобы LIKE 'prefix%' шёл по индексу.
         """
-        try:
-            category = Category.objects.get(slug=value)
-        except Category.DoesNotExist:
+        category_path = (
+            Category.objects
+            .filter(slug=value)
+            .values_list("path", flat=True)
+            .first()
+        )
+        if not category_path:
             return queryset.none()
 
-        # если есть MPTT
-        if hasattr(category, "get_descendants"):
-            categories = category.get_descendants(include_self=True)
-            return queryset.filter(category__in=categories)
-
-        # fallback: если нет MPTT — вручную (2 уровня)
-        child_ids = Category.objects.filter(
-            Q(id=category.id) |
-            Q(parent=category) |
-            Q(parent__parent=category)
-        ).values_list("id", flat=True)
-
-        return queryset.filter(category_id__in=child_ids)
+        return queryset.filter(category__path__startswith=category_path)
 
     def filter_in_stock(self, queryset, name, value):
         if value:
             return queryset.filter(stock__gt=0)
         return queryset
+
+    # ---- ATTRIBUTES ----
+    # ?attr.color=red,blue&attr.weight__lte=2&attr.wireless=true
+    ATTR_PREFIX = "attr."
+    NUMBER_LOOKUPS = ("exact", "lt", "lte", "gt", "gte")
+
+    def __init__(self, *args, skip_attribute=None, **kwargs):
+        # skip_attribute — без фильтра этого атрибута (его фасет, см. ProductFacetService)
+        self.skip_attribute = skip_attribute
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def attribute_slugs(cls, data):
+        return {
+            key[len(cls.ATTR_PREFIX):].partition("__")[0]
+            for key in data
+            if key.startswith(cls.ATTR_PREFIX)
+        }
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return self.filter_attributes(queryset)
+
+    def filter_attributes(self, queryset):
+        getlist = getattr(self.data, "getlist", lambda key: [self.data[key]])
+        params = {
+            key[len(self.ATTR_PREFIX):]: getlist(key)
+            for key in self.data
+            if key.startswith(self.ATTR_PREFIX)
+            and key[len(self.ATTR_PREFIX):].partition("__")[0] != self.skip_attribute
+        }
+        if not params:
+            return queryset
+
+        slugs = {key.partition("__")[0] for key in params}
+        attributes = {
+            attr.slug: attr
+            for attr in ProductAttribute.objects.filter(slug__in=slugs)
+        }
+
+        for key, values in params.items():
+            slug, _, lookup = key.partition("__")
+            attribute = attributes.get(slug)
+            if attribute is None:
+                return queryset.none()
+
+            conditions = self.attribute_conditions(attribute, lookup or "exact", values)
+            # EXISTS по индексам (attribute, value_*) — без JOIN-дублей
+            queryset = queryset.filter(
+                Exists(
+                    ProductAttributeValue.objects.filter(
+                        product=OuterRef("pk"),
+                        attribute=attribute,
+                        **conditions,
+                    )
+                )
+            )
+
+        return queryset
+
+    def attribute_conditions(self, attribute, lookup, values):
+        param = f"{self.ATTR_PREFIX}{attribute.slug}"
+        values = [v.strip() for value in values for v in value.split(",") if v.strip()]
+        if not values:
+            raise ValidationError({param: "Value is required"})
+
+        if attribute.value_type == ProductAttribute.NUMBER:
+            if lookup not in self.NUMBER_LOOKUPS:
+                raise ValidationError({param: f"Unsupported lookup: {lookup}"})
+            try:
+                numbers = [Decimal(v) for v in values]
+            except InvalidOperation:
+                raise ValidationError({param: "Number expected"})
+            # Decimal("NaN") / Decimal("Infinity") — не числа для фильтра
+            if not all(n.is_finite() for n in numbers):
+                raise ValidationError({param: "Number expected"})
+            if lookup == "exact":
+                return {"value_number__in": numbers}
+            if len(numbers) > 1:
+                raise ValidationError({param: "Single value expected"})
+            return {f"value_number__{lookup}": numbers[0]}
+
+        if lookup != "exact":
+            raise ValidationError({param: f"Unsupported lookup: {lookup}"})
+
+        if attribute.value_type == ProductAttribute.BOOLEAN:
+            try:
+                flags = {BOOL_VALUES[v.lower()] for v in values}
+            except KeyError:
+                raise ValidationError({param: "Boolean expected"})
+            return {"value_bool__in": flags}
+
+        return {"value_text__in": values}
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    ?search= через full-text бэкенд (tsvector / FTS5) вместо ILIKE '%term%'.
+    Добавляет аннотацию search_rank.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, "").strip()
+        if not term:
+            return queryset
+
+        return get_search_backend().search(queryset, term)
+
+
+class ProductOrderingFilter(filters.OrderingFilter):
+    """
+    При поиске без явного ?ordering= сортируем по релевантности.
+    ?ordering=popularity — популярные сначала (-popularity — наоборот).
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        return [
+            ("-popularity" if f == "popularity" else "popularity" if f == "-popularity" else f)
+            for f in ordering
+        ]
+
+    def get_default_ordering(self, view):
+        ordering = list(super().get_default_ordering(view) or [])
+
+        search_param = ProductSearchFilter.search_param
+        if view.request.query_params.get(search_param, "").strip():
+            return ["-search_rank", *ordering]
+        return ordering
@@ -0,0 +1,150 @@
+"""
+Производные изображения товаров (thumbnail / medium × WebP / AVIF).
+
+- render_variants() — чистый Pillow, без Django: выполняется в пуле процессов.
+- store_variants() — запись файлов рядом с оригиналом (тот же каталог
+  product_image_path, имя = имя оригинала + суффикс варианта) и
+  обновление ProductImage.variants / Product.main_image_variants.
+- schedule_variants() — фоновая обработка после загрузки (после коммита).
+
+PRODUCT_IMAGE_WORKERS = 0 — обрабатывать синхронно (dev / тесты).
+"""
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+VARIANT_SIZES = {
+    "thumb": (200, 200),
+    "medium": (800, 800),
+}
+VARIANT_FORMATS = tuple(
+    fmt for fmt in ("webp", "avif") if features.check(fmt)
+)
+VARIANT_QUALITY = 80
+
+_process_pool = None
+_dispatcher = None
+
+
+def variant_keys():
+    return [f"{size}_{fmt}" for size in VARIANT_SIZES for fmt in VARIANT_FORMATS]
+
+
+def variant_name(original_name, key):
+    """
+    products/7/<uuid>.jpg + thumb_webp → products/7/<uuid>_thumb.webp
+    """
+    stem, _ = os.path.splitext(original_name)
+    size, fmt = key.rsplit("_", 1)
+    return f"{stem}_{size}.{fmt}"
+
+
+def render_variants(data):
+    """
+    bytes оригинала → {key: bytes варианта}. Без Django — безопасно для пула.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ("RGB", "RGBA"):
+            source = source.convert("RGBA" if "A" in source.getbands() else "RGB")
+
+        result = {}
+        for size_name, size in VARIANT_SIZES.items():
+            resized = source.copy()
+            resized.thumbnail(size, Image.Resampling.LANCZOS)
+            for fmt in VARIANT_FORMATS:
+                buffer = io.BytesIO()
+                resized.save(buffer, format=fmt.upper(), quality=VARIANT_QUALITY)
+                result[f"{size_name}_{fmt}"] = buffer.getvalue()
+        return result
+
+
+def get_process_pool(workers):
+    global _process_pool
+    if _process_pool is None:
+        # spawn: дочерние процессы не наследуют соединения с БД
+        _process_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def store_variants(image, rendered):
+    """
+    Сохраняет отрендеренные варианты в storage и обновляет БД.
+    """
+    from django.core.files.base import ContentFile
+    from .cache import invalidate_product
+    from .models import Product, ProductImage
+
+    storage = image.image.storage
+    variants = {}
+    for key, content in rendered.items():
+        name = variant_name(image.image.name, key)
+        if storage.exists(name):
+            storage.delete(name)
+        variants[key] = storage.save(name, ContentFile(content))
+
+    # UPDATE мимо save(): не трогаем сигналы ProductImage
+    ProductImage.objects.filter(pk=image.pk, image=image.image.name).update(variants=variants)
+    Product.refresh_main_image(image.product_id)
+    # UPDATE мимо сигналов — сами сбрасываем кэш карточки и списков
+    # (main_image_variants есть в выдаче)
+    invalidate_product(image.product_id, listing=True)
+    image.variants = variants
+    return variants
+
+
+def generate_variants(image_id, pool=None):
+    from .models import ProductImage
+
+    image = ProductImage.objects.filter(pk=image_id).first()
+    if image is None or not image.image:
+        return None
+
+    with image.image.open("rb") as f:
+        data = f.read()
+
+    rendered = pool.submit(render_variants, data).result() if pool else render_variants(data)
+    return store_variants(image, rendered)
+
+
+def _generate_in_background(image_id, workers):
+    from django.db import close_old_connections
+
+    try:
+        generate_variants(image_id, pool=get_process_pool(workers))
+    except Exception:
+        logger.exception("product_image_variants_failed", extra={"image_id": image_id})
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(image_id):
+    """
+    Вызывать после коммита: файл оригинала уже в storage, строка — в БД.
+    """
+    global _dispatcher
+    from django.conf import settings
+
+    workers = getattr(settings, "PRODUCT_IMAGE_WORKERS", 0)
+    if not workers:
+        # синхронно, но уже после коммита: ошибка рендера не должна
+        # превращать сохранённую загрузку в 500
+        try:
+            generate_variants(image_id)
+        except Exception:
+            logger.exception("product_image_variants_failed", extra={"image_id": image_id})
+        return
+
+    if _dispatcher is None:
+        # поток-диспетчер: I/O и ORM, рендер — в пуле процессов
+        _dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="product-images")
+    _dispatcher.submit(_generate_in_background, image_id, workers)
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from apps.products.models import Product
+from apps.products.serializers import ProductListProjection, ProductListSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-page CPU time of ProductListSerializer and "
+        "ProductListProjection (fetch, serialize, render JSON)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        repeat = options["repeat"]
+
+        queryset = Product.objects.filter(is_active=True).order_by("-created_at")
+        if not queryset.exists():
+            raise CommandError("No products, run seed_p first")
+
+        request = APIRequestFactory().get("/api/products/")
+        renderer = JSONRenderer()
+
+        def serializer_page():
+            page = list(queryset.select_related("category")[:page_size])
+            data = ProductListSerializer(page, many=True, context={"request": request}).data
+            return renderer.render(data)
+
+        def projection_page():
+            rows = list(ProductListProjection.project(queryset)[:page_size])
+            return renderer.render(ProductListProjection.serialize(rows, request))
+
+        # одинаковый вывод — иначе сравнение бессмысленно
+        if serializer_page() != projection_page():
+            raise CommandError("Outputs differ")
+
+        self.stdout.write(self.style.WARNING(
+            f"Page size {page_size}, {repeat} runs each (CPU time per page):"
+        ))
+        results = {}
+        for name, build in (("serializer", serializer_page), ("projection", projection_page)):
+            started = time.process_time()
+            for _ in range(repeat):
+                build()
+            results[name] = (time.process_time() - started) / repeat * 1000
+            self.stdout.write(f"  {name:<11} {results[name]:.2f} ms")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Projection is {results['serializer'] / results['projection']:.1f}x faster."
+        ))
@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, iter_products, render
+from apps.products.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = "Stream the product catalog to NDJSON / CSV (constant memory)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-o", "--output",
+            help="Output file (default: stdout)"
+        )
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument(
+            "--category",
+            help="Category slug (descendants included)"
+        )
+        parser.add_argument("--active-only", action="store_true")
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.all()
+
+        if options["category"]:
+            path = (
+                Category.objects
+                .filter(slug=options["category"])
+                .values_list("path", flat=True)
+                .first()
+            )
+            if path is None:
+                raise CommandError(f"Unknown category: {options['category']}")
+            queryset = queryset.filter(category__path__startswith=path)
+
+        if options["active_only"]:
+            queryset = queryset.filter(is_active=True)
+
+        rows = iter_products(queryset, chunk_size=options["chunk_size"])
+        lines = render(rows, options["format"])
+
+        output = options["output"]
+        if not output:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        started = time.monotonic()
+        count = 0
+        with open(output, "w", encoding="utf-8", newline="") as f:
+            for line in lines:
+                f.write(line)
+                count += 1
+
+        if options["format"] == "csv":
+            count -= 1  # заголовок
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {count} products to {output} in {elapsed:.1f}s "
+            f"({count / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
@@ -0,0 +1,71 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from apps.products.images import render_variants, store_variants, variant_keys
+from apps.products.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = "Backfill thumbnail / WebP / AVIF variants for existing product images"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate variants even if they already exist"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        expected = set(variant_keys())
+
+        qs = ProductImage.objects.exclude(image="").order_by("pk")
+        self.stdout.write(self.style.WARNING(f"Processing images ({options['workers']} workers)..."))
+
+        processed = failed = 0
+        started = time.monotonic()
+        last_pk = 0
+
+        with ProcessPoolExecutor(
+            max_workers=options["workers"],
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            while True:
+                batch = list(qs.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+
+                if not options["force"]:
+                    batch = [img for img in batch if set(img.variants) != expected]
+
+                sources = []
+                for image in batch:
+                    try:
+                        with image.image.open("rb") as f:
+                            sources.append((image, f.read()))
+                    except (OSError, ValueError) as exc:
+                        failed += 1
+                        self.stderr.write(f"#{image.pk}: {exc}")
+
+                futures = [(image, pool.submit(render_variants, data)) for image, data in sources]
+                for image, future in futures:
+                    try:
+                        store_variants(image, future.result())
+                        processed += 1
+                    except Exception as exc:
+                        failed += 1
+                        self.stderr.write(f"#{image.pk}: {exc}")
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"  processed={processed} failed={failed} "
+                    f"({processed / elapsed if elapsed else 0:.1f} img/s)"
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"Variants generated: {processed}, failed: {failed}"))
@@ -0,0 +1,293 @@
+import csv
+import json
+import time
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.products.cache import invalidate_catalog
+from apps.products.filters import BOOL_VALUES
+from apps.products.models import (
+    Category,
+    Product,
+    ProductAttribute,
+    ProductAttributeValue,
+)
+from apps.products.search import get_search_backend
+from apps.products.services import CategoryStatsService
+
+PRODUCT_UPDATE_FIELDS = [
+    "category",
+    "name",
+    "description",
+    "price",
+    "old_price",
+    "stock",
+    "is_active",
+    "updated_at",
+]
+ATTR_PREFIX = "attr."
+# price / old_price / value_number: max_digits=10, decimal_places=2
+DECIMAL_PLACES = Decimal("0.01")
+DECIMAL_LIMIT = Decimal(10) ** 8
+
+
+class RowError(ValueError):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream products from CSV / JSONL and upsert them by slug in batches. "
+        "Columns: slug, name, category (slug), price, old_price, stock, "
+        "description, is_active, attr.<attribute slug>..."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSONL file ('-' is not supported)")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Input format (default: by file extension)"
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--max-errors",
+            type=int,
+            default=20,
+            help="How many row errors to print"
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+
+        fmt = options["format"] or ("jsonl" if path.suffix in (".jsonl", ".ndjson") else "csv")
+        batch_size = options["batch_size"]
+        self.max_errors = options["max_errors"]
+
+        # справочники целиком в памяти — без запросов на каждую строку
+        self.categories = dict(Category.objects.values_list("slug", "id"))
+        self.attributes = {
+            slug: (pk, value_type)
+            for pk, slug, value_type in ProductAttribute.objects.values_list("id", "slug", "value_type")
+        }
+        self.unknown_attributes = set()
+        self.errors = 0
+
+        self.stdout.write(self.style.WARNING(f"Importing {path} ({fmt}, batch={batch_size})..."))
+        started = time.monotonic()
+        imported = 0
+
+        batch = {}
+        for line_no, row in self.read_rows(path, fmt):
+            try:
+                product, values = self.parse_row(row)
+            except RowError as exc:
+                self.report_error(line_no, exc)
+                continue
+
+            # дубли slug внутри пачки: побеждает последняя строка
+            batch[product.slug] = (product, values)
+            if len(batch) >= batch_size:
+                imported += self.flush(batch)
+                batch = {}
+                self.report_progress(imported, started)
+
+        if batch:
+            imported += self.flush(batch)
+            self.report_progress(imported, started)
+
+        CategoryStatsService.refresh()
+        invalidate_catalog()
+
+        for slug in sorted(self.unknown_attributes):
+            self.stderr.write(f"Unknown attribute column ignored: {ATTR_PREFIX}{slug}")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} products in {elapsed:.1f}s "
+            f"({imported / elapsed if elapsed else 0:.0f} rows/s), errors: {self.errors}"
+        ))
+
+    # ---- READING ----
+    def read_rows(self, path, fmt):
+        with open(path, encoding="utf-8", newline="") as f:
+            if fmt == "csv":
+                # line_no = номер строки файла (1 — заголовок)
+                for line_no, row in enumerate(csv.DictReader(f), start=2):
+                    yield line_no, row
+                return
+
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    self.report_error(line_no, exc)
+                    continue
+                yield line_no, row
+
+    # ---- PARSING ----
+    def parse_row(self, row):
+        # JSONL: строкой может оказаться любой JSON — список, число, null
+        if not isinstance(row, dict):
+            raise RowError(f"expected an object, got {type(row).__name__}")
+
+        # JSONL: атрибуты можно передать вложенным объектом
+        attributes = row.pop("attributes", None) or {}
+        if not isinstance(attributes, dict):
+            raise RowError("attributes: expected an object")
+        for slug, value in attributes.items():
+            row[f"{ATTR_PREFIX}{slug}"] = value
+
+        slug = self.parse_text(row.get("slug"), "slug")
+        if not slug:
+            raise RowError("slug is required")
+
+        category_id = self.categories.get(self.parse_text(row.get("category"), "category"))
+        if category_id is None:
+            raise RowError(f"unknown category {row.get('category')!r}")
+
+        now = timezone.now()
+        product = Product(
+            slug=slug,
+            name=self.parse_text(row.get("name"), "name") or slug,
+            category_id=category_id,
+            description=self.parse_text(row.get("description"), "description", strip=False),
+            price=self.parse_decimal(row.get("price"), "price", required=True),
+            old_price=self.parse_decimal(row.get("old_price"), "old_price"),
+            stock=self.parse_stock(row.get("stock")),
+            is_active=self.parse_bool(row.get("is_active"), default=True),
+            created_at=now,
+            updated_at=now,
+        )
+
+        values = []
+        for key, raw in row.items():
+            if not key.startswith(ATTR_PREFIX) or raw in (None, ""):
+                continue
+            attr_slug = key[len(ATTR_PREFIX):]
+            if attr_slug not in self.attributes:
+                self.unknown_attributes.add(attr_slug)
+                continue
+            values.append(self.parse_attribute(attr_slug, raw))
+
+        return product, values
+
+    def parse_attribute(self, slug, raw):
+        attribute_id, value_type = self.attributes[slug]
+        value = ProductAttributeValue(attribute_id=attribute_id)
+
+        if value_type == ProductAttribute.NUMBER:
+            value.value_number = self.parse_decimal(raw, f"{ATTR_PREFIX}{slug}", required=True)
+        elif value_type == ProductAttribute.BOOLEAN:
+            value.value_bool = self.parse_bool(raw)
+        else:
+            value.value_text = str(raw)[:255]
+        return value
+
+    def parse_text(self, raw, field, strip=True):
+        # JSONL: {"slug": 123} — не угадываем, а сообщаем о строке
+        if raw is None:
+            return ""
+        if not isinstance(raw, str):
+            raise RowError(f"{field}: expected a string, got {type(raw).__name__}")
+        return raw.strip() if strip else raw
+
+    def parse_decimal(self, raw, field, required=False):
+        if raw in (None, ""):
+            if required:
+                raise RowError(f"{field} is required")
+            return None
+        try:
+            value = Decimal(str(raw))
+            # NaN / Infinity Decimal() принимает — отсекаем сами
+            if not value.is_finite():
+                raise InvalidOperation
+            value = value.quantize(DECIMAL_PLACES, rounding=ROUND_HALF_UP)
+        except InvalidOperation:
+            raise RowError(f"{field}: invalid number {raw!r}")
+        if abs(value) >= DECIMAL_LIMIT:
+            raise RowError(f"{field}: {raw!r} is out of range")
+        return value
+
+    def parse_stock(self, raw):
+        if raw in (None, ""):
+            return 0
+        # JSONL: int(true) == 1, int(2.7) == 2 — такое не обрезаем молча
+        if isinstance(raw, bool) or (isinstance(raw, float) and not raw.is_integer()):
+            raise RowError(f"stock: invalid integer {raw!r}")
+        try:
+            stock = int(raw)
+        except (TypeError, ValueError):
+            raise RowError(f"stock: invalid integer {raw!r}")
+        if stock < 0:
+            raise RowError("stock must be >= 0")
+        return stock
+
+    def parse_bool(self, raw, default=None):
+        if raw in (None, ""):
+            return default
+        if isinstance(raw, bool):
+            return raw
+        try:
+            return BOOL_VALUES[str(raw).strip().lower()]
+        except KeyError:
+            raise RowError(f"invalid boolean {raw!r}")
+
+    # ---- WRITING ----
+    def flush(self, batch):
+        products = [product for product, _ in batch.values()]
+
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                products,
+                update_conflicts=True,
+                unique_fields=["slug"],
+                update_fields=PRODUCT_UPDATE_FIELDS,
+            )
+
+            # id по slug одним запросом (RETURNING при upsert есть не везде)
+            ids = dict(
+                Product.objects
+                .filter(slug__in=batch.keys())
+                .values_list("slug", "id")
+            )
+
+            values = []
+            for slug, (_, product_values) in batch.items():
+                for value in product_values:
+                    value.product_id = ids[slug]
+                    values.append(value)
+
+            if values:
+                ProductAttributeValue.objects.bulk_create(
+                    values,
+                    update_conflicts=True,
+                    unique_fields=["product", "attribute"],
+                    update_fields=["value_text", "value_number", "value_bool"],
+                )
+
+            # bulk_create идёт мимо сигналов — синхронизируем поиск сами
+            get_search_backend().update_products(ids.values())
+
+        return len(products)
+
+    # ---- REPORTING ----
+    def report_error(self, line_no, exc):
+        self.errors += 1
+        if self.errors <= self.max_errors:
+            self.stderr.write(f"line {line_no}: {exc}")
+
+    def report_progress(self, imported, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"  {imported} rows, {imported / elapsed if elapsed else 0:.0f} rows/s"
+        )
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.products.cleanup import MAX_ATTEMPTS, process_pending
+from apps.products.models import PendingFileDeletion
+
+
+class Command(BaseCommand):
+    help = "Delete queued product image files from storage in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--workers", type=int, default=8, help="Parallel storage deletes")
+        parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process a single batch (default: until the queue is empty)"
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("Processing file deletion queue..."))
+        started = time.monotonic()
+        totals = {"deleted": 0, "skipped": 0, "failed": 0}
+
+        while True:
+            metrics = process_pending(
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                max_attempts=options["max_attempts"],
+            )
+            for key, value in metrics.items():
+                totals[key] += value
+            if options["once"] or not any(metrics.values()):
+                break
+            # пачка только из ошибок — не крутимся, ждём следующего запуска
+            if metrics["failed"] and not metrics["deleted"] and not metrics["skipped"]:
+                break
+
+        given_up = PendingFileDeletion.objects.filter(attempts__gte=options["max_attempts"]).count()
+        if given_up:
+            self.stderr.write(f"{given_up} files exceeded {options['max_attempts']} attempts, see last_error")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {totals['deleted']}, skipped (still in use) {totals['skipped']}, "
+            f"failed {totals['failed']} in {elapsed:.1f}s."
+        ))
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.products.services import CoPurchaseService
+
+
+class Command(BaseCommand):
+    help = "Recompute the frequently-bought-together index from finalized orders"
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("Rebuilding co-purchase index..."))
+        started = time.monotonic()
+        pairs = CoPurchaseService.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Co-purchase index rebuilt: {pairs} pairs in {time.monotonic() - started:.1f}s."
+        ))
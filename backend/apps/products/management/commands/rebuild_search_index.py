@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index (no-op for PostgreSQL generated column)"
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        self.stdout.write(self.style.WARNING(f"Rebuilding search index ({type(backend).__name__})..."))
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.services import CategoryStatsService
+
+
+class Command(BaseCommand):
+    help = "Recompute per-category product counts and price ranges (after bulk changes)"
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("Refreshing category stats..."))
+        updated = CategoryStatsService.refresh()
+        self.stdout.write(self.style.SUCCESS(f"Category stats refreshed for {updated} categories."))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.products.cache import invalidate_catalog
+from apps.products.services import PopularityService
+
+
+class Command(BaseCommand):
+    help = "Recompute Product.popularity from recent sales (run periodically, e.g. hourly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--window-days", type=int, default=PopularityService.WINDOW_DAYS)
+        parser.add_argument("--half-life-days", type=float, default=PopularityService.HALF_LIFE_DAYS)
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("Refreshing popularity..."))
+        started = time.monotonic()
+        updated = PopularityService.refresh(
+            window_days=options["window_days"],
+            half_life_days=options["half_life_days"],
+        )
+        # сортировка выдачи изменилась
+        invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(
+            f"Popularity refreshed for {updated} products in {time.monotonic() - started:.1f}s."
+        ))
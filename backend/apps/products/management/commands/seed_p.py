@@ -1,8 +1,9 @@
 import random
+import time
 import requests
 from faker import Faker
 from django.core.files.base import ContentFile
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils.text import slugify
 from django.contrib.auth import get_user_model
 from django.db import transaction
@@ -16,7 +17,11 @@ from apps.products.models import (
 )
 from apps.reviews.models import Review
 from apps.orders.models import Order, OrderItem, Store
+from apps.orders.services import PurchaseService
 from apps.cart.models import Cart, CartItem
+from apps.products import seeding
+from apps.products.cache import invalidate_catalog
+from apps.products.services import CategoryStatsService, CoPurchaseService, PopularityService
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -25,7 +30,10 @@ User = get_user_model()
 
 
 class Command(BaseCommand):
-    help = "Idempotent seed: users, categories, attributes, products, images, reviews, orders"
+    help = (
+        "Idempotent seed: users, categories, attributes, products, images, reviews, orders. "
+        "--scale N: offline deterministic bulk dataset for load testing"
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -34,10 +42,34 @@ class Command(BaseCommand):
             help="Clear all data before seeding"
         )
 
+        # --scale: синтетический датасет для нагрузочных тестов (см. seeding.py)
+        parser.add_argument(
+            "--scale",
+            type=int,
+            help="Generate N products offline with bulk_create (e.g. 1000000)"
+        )
+        parser.add_argument("--seed", type=int, default=42, help="RNG seed (--scale)")
+        parser.add_argument("--workers", type=int, default=1, help="Processes (--scale)")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Products per chunk (--scale)")
+        parser.add_argument(
+            "--users",
+            type=int,
+            help="Users to create (--scale, default: scale / 10)"
+        )
+        parser.add_argument("--image-pool", type=int, default=20, help="Shared placeholder images (--scale)")
+        parser.add_argument("--max-images", type=int, default=3, help="Images per product (--scale)")
+        parser.add_argument("--max-reviews", type=int, default=5, help="Reviews per product (--scale)")
+        parser.add_argument("--orders-ratio", type=float, default=0.2, help="Orders per product (--scale)")
+        parser.add_argument("--carts-ratio", type=float, default=0.05, help="Filled carts per product (--scale)")
+
     def handle(self, *args, **options):
         if options["reset"]:
             self.reset_database()
 
+        if options["scale"]:
+            self.seed_scale(options)
+            return
+
         self.stdout.write(self.style.WARNING("Seeding database..."))
 
         self.seed_users()
@@ -70,6 +102,72 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS("Database cleared."))
 
+    # ============================================================
+    # SCALE (offline, bulk, deterministic)
+    # ============================================================
+    def seed_scale(self, options):
+        if Product.objects.exists():
+            raise CommandError("--scale expects an empty catalog, use --reset")
+
+        scale = options["scale"]
+        seed = options["seed"]
+        batch_size = options["batch_size"]
+        started = time.monotonic()
+
+        self.stdout.write(self.style.WARNING(f"Seeding {scale} products (seed={seed})..."))
+
+        # категории и атрибуты — те же, что в обычном seed
+        self.seed_categories()
+        self.seed_attributes()
+
+        vocabulary = seeding.build_vocabulary(seed)
+
+        self.stdout.write(self.style.WARNING("Creating image pool..."))
+        image_pool = seeding.build_image_pool(options["image_pool"], seed)
+
+        users_count = options["users"] or max(10, scale // 10)
+        self.stdout.write(self.style.WARNING(f"Creating {users_count} users..."))
+        users = seeding.seed_users(users_count, seed, vocabulary, batch_size)
+
+        context = {
+            "seed": seed,
+            "products": scale,
+            "batch_size": batch_size,
+            "vocabulary": vocabulary,
+            "image_pool": image_pool,
+            "users": users,
+            "categories": list(
+                Category.objects
+                .filter(parent__isnull=False)
+                .order_by("id")
+                .values_list("id", flat=True)
+            ),
+            "attributes": [(a.id, a.value_type, a.slug) for a in self.attributes],
+            "max_images": max(1, options["max_images"]),
+            "max_reviews": options["max_reviews"],
+            "orders_ratio": options["orders_ratio"],
+            "carts_ratio": options["carts_ratio"],
+        }
+
+        def progress(done):
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"  {done}/{scale} products, {done / elapsed:.0f} products/s")
+
+        self.stdout.write(self.style.WARNING(f"Creating products ({options['workers']} workers)..."))
+        seeding.run(context, options["workers"], on_chunk=progress)
+
+        # всё создано bulk_create — производные данные пересчитываем целиком
+        self.stdout.write(self.style.WARNING("Rebuilding co-purchase index, popularity, category stats, purchases..."))
+        CoPurchaseService.rebuild()
+        PurchaseService.rebuild()
+        PopularityService.refresh()
+        CategoryStatsService.refresh()
+        invalidate_catalog()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"SCALE SEED COMPLETED in {time.monotonic() - started:.1f}s."
+        ))
+
     # ============================================================
     # USERS
     # ============================================================
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-17 12:24
+
+from django.db import migrations, models
+
+
+def fill_category_paths(apps, schema_editor):
+    Category = apps.get_model("products", "Category")
+
+    rows = list(Category.objects.values_list("id", "parent_id"))
+    children = {}
+    for pk, parent_id in rows:
+        children.setdefault(parent_id, []).append(pk)
+
+    to_update = []
+    stack = [(pk, "", 0) for pk in children.get(None, [])]
+    while stack:
+        pk, parent_path, depth = stack.pop()
+        path = f"{parent_path}{pk}/"
+        to_update.append(Category(pk=pk, path=path, depth=depth))
+        stack.extend((child, path, depth + 1) for child in children.get(pk, []))
+
+    Category.objects.bulk_update(to_update, ["path", "depth"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_productattribute_productattributevalue_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_category_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-17 13:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_reviews_count(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Review = apps.get_model("reviews", "Review")
+
+    count_sq = Subquery(
+        Review.objects
+        .filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+        .annotate(c=Count("id"))
+        .values("c")[:1]
+    )
+    Product.objects.update(reviews_count=Coalesce(count_sq, Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_search_index'),
+        ('reviews', '0002_alter_review_rating_alter_review_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_reviews_count, migrations.RunPython.noop),
+    ]
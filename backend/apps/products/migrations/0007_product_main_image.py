@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-17 14:30
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_main_image(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductImage = apps.get_model("products", "ProductImage")
+
+    first_image = (
+        ProductImage.objects
+        .filter(product_id=OuterRef("pk"))
+        .order_by("-is_main", "id")
+        .values("image")[:1]
+    )
+    Product.objects.update(main_image=Coalesce(Subquery(first_image), Value("")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_reviews_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='main_image',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_main_image, migrations.RunPython.noop),
+    ]
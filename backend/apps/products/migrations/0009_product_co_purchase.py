@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-17 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_productimage_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCoPurchase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='co_purchases', to='products.product')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='co_purchased_by', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', '-count'], name='products_pr_product_019a99_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'related'), name='unique_product_co_purchase')],
+            },
+        ),
+    ]
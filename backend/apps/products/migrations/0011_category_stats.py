@@ -0,0 +1,49 @@
+# Generated by Django 6.0.1 on 2026-10-17 14:10
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def fill_category_stats(apps, schema_editor):
+    Category = apps.get_model("products", "Category")
+    Product = apps.get_model("products", "Product")
+
+    stats = (
+        Product.objects
+        .filter(is_active=True)
+        .values("category_id")
+        .annotate(count=Count("id"), min=Min("price"), max=Max("price"))
+        .order_by()
+    )
+    for row in stats:
+        Category.objects.filter(pk=row["category_id"]).update(
+            own_products_count=row["count"],
+            own_min_price=row["min"],
+            own_max_price=row["max"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_product_popularity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='own_max_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='own_min_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='own_products_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_category_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-17 15:00
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_rating_sum(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Review = apps.get_model("reviews", "Review")
+
+    sum_sq = Subquery(
+        Review.objects
+        .filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+        .annotate(s=Sum("rating"))
+        .values("s")[:1]
+    )
+    Product.objects.update(rating_sum=Coalesce(sum_sq, Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_pending_file_deletion'),
+        ('reviews', '0002_alter_review_rating_alter_review_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_rating_sum, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 6.0.1 on 2026-10-17 16:00
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_stars(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Review = apps.get_model("reviews", "Review")
+
+    def star_count(star):
+        return Coalesce(
+            Subquery(
+                Review.objects
+                .filter(product=OuterRef("pk"), rating=star)
+                .order_by()
+                .values("product")
+                .annotate(c=Count("id"))
+                .values("c")[:1]
+            ),
+            Value(0),
+        )
+
+    Product.objects.update(**{f"stars_{star}": star_count(star) for star in range(1, 6)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_product_rating_sum'),
+        ('reviews', '0002_alter_review_rating_alter_review_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stars_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='stars_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='stars_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='stars_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='stars_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_stars, migrations.RunPython.noop),
+    ]
@@ -2,7 +2,9 @@ from .validators import validate_image_mime, validate_image_size
 import uuid
 from apps.common.models import TimeStampedModel
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Substr
 
 class Category(TimeStampedModel):
     name = models.CharField(max_length=255)
@@ -16,6 +18,23 @@ class Category(TimeStampedModel):
     )
     is_active = models.BooleanField(default=True)
 
+    # materialized path: "1/5/12/" — id всех предков + свой id.
+    # Поддерживается в save(), индекс нужен для startswith-поиска поддерева
+    path = models.CharField(max_length=255, db_index=True, editable=False, default="")
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    # агрегаты по собственным активным товарам (без потомков), см. CategoryStatsService;
+    # сводка по поддереву считается при сборке дерева
+    own_products_count = models.PositiveIntegerField(default=0, editable=False)
+    own_min_price = models.DecimalField(
+        max_digits=10, decimal_places=2,
+        null=True, blank=True, editable=False,
+    )
+    own_max_price = models.DecimalField(
+        max_digits=10, decimal_places=2,
+        null=True, blank=True, editable=False,
+    )
+
     class Meta:
         verbose_name_plural = 'Categories'
 
@@ -26,12 +45,53 @@ class Category(TimeStampedModel):
         """
         Защита от циклов:
         A -> B -> C -> A
+        Родитель не может лежать в собственном поддереве категории.
         """
-        parent = self.parent
-        while parent:
-            if parent == self:
-                raise ValidationError("Category cannot be parent of itself or create a cycle")
-            parent = parent.parent
+        if not self.pk or not self.parent_id:
+            return
+
+        if self.parent_id == self.pk or self.parent.path.startswith(self.path):
+            raise ValidationError("Category cannot be parent of itself or create a cycle")
+
+    def build_path(self):
+        if self.parent_id:
+            return f"{self.parent.path}{self.pk}/"
+        return f"{self.pk}/"
+
+    def save(self, *args, **kwargs):
+        """
+        Пересчитывает path/depth; при переносе категории
+        одним UPDATE переписывает пути всего поддерева.
+        """
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            old_path = self.path
+            new_path = self.build_path()
+            if new_path == old_path:
+                return
+
+            old_depth = self.depth
+            self.path = new_path
+            self.depth = new_path.count("/") - 1
+            Category.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+
+            if old_path:
+                (
+                    Category.objects
+                    .filter(path__startswith=old_path)
+                    .exclude(pk=self.pk)
+                    .update(
+                        path=Concat(Value(new_path), Substr("path", len(old_path) + 1)),
+                        depth=F("depth") + (self.depth - old_depth),
+                    )
+                )
+
+    def get_descendants(self, include_self=False):
+        qs = Category.objects.filter(path__startswith=self.path)
+        if not include_self:
+            qs = qs.exclude(pk=self.pk)
+        return qs
 
 
 
@@ -64,6 +124,25 @@ class Product(TimeStampedModel):
         default=0,
     )
 
+    # денормализованный счётчик отзывов, ведётся из apps.reviews
+    reviews_count = models.PositiveIntegerField(default=0)
+    # сумма оценок: rating = rating_sum / reviews_count без AVG по отзывам
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    # распределение оценок (сколько отзывов на 1★ … 5★) — для сводки отзывов
+    stars_1 = models.PositiveIntegerField(default=0, editable=False)
+    stars_2 = models.PositiveIntegerField(default=0, editable=False)
+    stars_3 = models.PositiveIntegerField(default=0, editable=False)
+    stars_4 = models.PositiveIntegerField(default=0, editable=False)
+    stars_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    # имя файла главного изображения (is_main, иначе первое по id);
+    # ведётся сигналами ProductImage — списку не нужен prefetch картинок
+    main_image = models.CharField(max_length=255, blank=True, editable=False)
+    main_image_variants = models.JSONField(null=True, blank=True, editable=False)
+
+    # продажи за окно с затуханием по давности, см. PopularityService
+    popularity = models.FloatField(default=0, editable=False)
+
     # остаток — только >= 0
     stock = models.PositiveIntegerField(default=0)
 
@@ -75,6 +154,7 @@ class Product(TimeStampedModel):
             models.Index(fields=["price"]),
             models.Index(fields=["category", "is_active"]),
             models.Index(fields=["slug"]),
+            models.Index(fields=["-popularity", "id"]),
         ]
         constraints = [
             # защита от отрицательного остатка
@@ -92,6 +172,21 @@ class Product(TimeStampedModel):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def refresh_main_image(cls, product_id):
+        """
+        Пересчитывает main_image одним UPDATE (без save() и сигналов Product).
+        """
+        first_image = (
+            ProductImage.objects
+            .filter(product_id=OuterRef("pk"))
+            .order_by("-is_main", "id")
+        )
+        cls.objects.filter(pk=product_id).update(
+            main_image=Coalesce(Subquery(first_image.values("image")[:1]), Value("")),
+            main_image_variants=Subquery(first_image.values("variants")[:1]),
+        )
+
 
 def product_image_path(instance, filename):
     ext = filename.split('.')[-1]
@@ -111,6 +206,10 @@ class ProductImage(models.Model):
     )
     is_main = models.BooleanField(default=False)
 
+    # производные (thumbnail / webp / avif): {"thumb_webp": "products/7/<uuid>_thumb.webp", ...}
+    # заполняется фоном, см. images.py
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+
     class Meta:
         # гарантируем: только одно главное изображение на продукт
         constraints = [
@@ -201,4 +300,58 @@ class ProductAttributeValue(models.Model):
             val = str(self.value_bool)
         else:
             val = self.value_text or ""
-        return f"{self.product} | {self.attribute}: {val}"
\ No newline at end of file
+        return f"{self.product} | {self.attribute}: {val}"
+
+class ProductCoPurchase(models.Model):
+    """
+    «Покупают вместе»: сколько заказов содержат и product, и related.
+    Пара хранится в обе стороны — top-N для товара = один индексный
+    диапазон по (product, -count). См. CoPurchaseService.
+    """
+    product = models.ForeignKey(
+        Product,
+        related_name="co_purchases",
+        on_delete=models.CASCADE,
+    )
+    related = models.ForeignKey(
+        Product,
+        related_name="co_purchased_by",
+        on_delete=models.CASCADE,
+    )
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "related"],
+                name="unique_product_co_purchase",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["product", "-count"]),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} + {self.related_id}: {self.count}"
+
+
+class PendingFileDeletion(models.Model):
+    """
+    Очередь удаления файлов из storage (оригиналы и производные картинок).
+    Пишется в транзакции удаления / замены, разбирается пачками
+    (cleanup.process_pending, команда process_file_deletions).
+    """
+    name = models.CharField(max_length=255)
+    # оригинал, от которого зависит файл: пока он используется — не удаляем
+    source = models.CharField(max_length=255, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["attempts", "id"]),
+        ]
+
+    def __str__(self):
+        return self.name
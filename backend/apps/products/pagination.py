@@ -0,0 +1,205 @@
+import base64
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Unsupported cursor value: {value!r}")
+
+
+def estimate_count(queryset):
+    """
+    Приблизительное число строк без COUNT(*):
+    на PostgreSQL — оценка планировщика (EXPLAIN), иначе точный count().
+    """
+    if connection.vendor != "postgresql":
+        return queryset.count()
+
+    sql, params = queryset.order_by().values("pk").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) пагинация: WHERE (order fields, id) > last seen
+    вместо OFFSET и без COUNT(*).
+
+    Работает с любым ordering, которое уже применил OrderingFilter;
+    id добавляется как tiebreak. Только вперёд (infinite scroll):
+    ?cursor= — первая страница, дальше ссылка из "next".
+    ?with_count=1 — добавить приблизительный "count" (кэшируется).
+    """
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    count_query_param = "with_count"
+    count_cache_timeout = 300
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+
+        ordering = self.get_ordering(queryset)
+        self.ordering = ordering
+        queryset = queryset.order_by(*ordering)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ("1", "true"):
+            self.count = self.get_approximate_count(queryset, request)
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            values = self.decode_cursor(encoded, ordering)
+            queryset = queryset.filter(self.build_keyset_filter(ordering, values))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        payload = {"next": self.get_next_link(), "results": data}
+        if self.count is not None:
+            payload = {"count": self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "count": {"type": "integer", "example": 500000},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Keyset cursor (empty value — first page).",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Include approximate total count.",
+                "schema": {"type": "boolean"},
+            },
+        ]
+
+    # ---- helpers ----
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        ordering = [f for f in queryset.query.order_by if isinstance(f, str)]
+        if not ordering:
+            ordering = ["-pk"]
+
+        names = {f.lstrip("-") for f in ordering}
+        if not names & {"id", "pk"}:
+            # tiebreak в направлении последнего поля
+            ordering.append("-id" if ordering[-1].startswith("-") else "id")
+        return ordering
+
+    def build_keyset_filter(self, ordering, values):
+        """
+        (a, b, id) > (va, vb, vid) c учётом направления каждого поля:
+        a > va OR (a = va AND b > vb) OR (a = va AND b = vb AND id > vid)
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    def encode_cursor(self, obj):
+        # obj — модель или строка values()
+        if isinstance(obj, dict):
+            values = [obj["id" if f.lstrip("-") == "pk" else f.lstrip("-")] for f in self.ordering]
+        else:
+            values = [getattr(obj, f.lstrip("-")) for f in self.ordering]
+        raw = json.dumps({"o": self.ordering, "v": values}, default=_json_default)
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, encoded, ordering):
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound("Invalid cursor")
+
+        # курсор от другой сортировки не применим
+        if not isinstance(data, dict) or data.get("o") != ordering:
+            raise NotFound("Invalid cursor")
+        values = data.get("v")
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound("Invalid cursor")
+        return values
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1]),
+        )
+        return remove_query_param(url, self.count_query_param)
+
+    def get_approximate_count(self, queryset, request):
+        params = sorted(
+            (k, v) for k, v in request.query_params.lists()
+            if k not in (self.cursor_query_param, self.page_size_query_param, self.count_query_param)
+        )
+        digest = hashlib.md5(
+            json.dumps([request.path, request.user.is_staff, params]).encode()
+        ).hexdigest()
+        key = f"keyset_count:{digest}"
+
+        count = cache.get(key)
+        if count is None:
+            count = estimate_count(queryset)
+            cache.set(key, count, timeout=self.count_cache_timeout)
+        return count
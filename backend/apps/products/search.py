@@ -0,0 +1,179 @@
+"""
+Full-text search по товарам.
+
+- PostgreSQL: generated-колонка products_product.search_vector (tsvector)
+  + GIN-индекс, ранжирование ts_rank_cd. Синхронизацию делает сама БД.
+- SQLite (dev/test): FTS5-таблица products_product_fts (rowid = product.id),
+  синхронизируется сигналами Product (см. signals.py).
+- Остальные СУБД: старое поведение (icontains), rank = 0.
+
+Бэкенд выбирается по connection.vendor, либо явно через
+settings.PRODUCT_SEARCH_BACKEND (dotted path к классу).
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# поля товара, которые попадают в индекс (save(update_fields=...))
+INDEXED_FIELDS = {"name", "description"}
+
+
+def tokenize(term):
+    return TOKEN_RE.findall(term.lower())
+
+
+class BaseSearchBackend:
+    """
+    search() фильтрует queryset и добавляет аннотацию search_rank
+    (чем больше — тем релевантнее).
+    """
+
+    def search(self, queryset, term):
+        raise NotImplementedError
+
+    def update_product(self, product):
+        pass
+
+    def remove_product(self, product_id):
+        pass
+
+    def update_products(self, product_ids):
+        """
+        Пакетная синхронизация (bulk-операции идут мимо сигналов).
+        """
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class IContainsSearchBackend(BaseSearchBackend):
+
+    def search(self, queryset, term):
+        for token in tokenize(term):
+            queryset = queryset.filter(
+                Q(name__icontains=token) | Q(description__icontains=token)
+            )
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    CONFIG = "simple"
+
+    def search(self, queryset, term):
+        # импорт здесь: contrib.postgres требует psycopg
+        from django.contrib.postgres.search import (
+            SearchQuery,
+            SearchRank,
+            SearchVectorField,
+        )
+
+        tokens = tokenize(term)
+        if not tokens:
+            return queryset.none()
+
+        # префиксный поиск по каждому слову: "sams gal" → sams:* & gal:*
+        query = SearchQuery(
+            " & ".join(f"{token}:*" for token in tokens),
+            search_type="raw",
+            config=self.CONFIG,
+        )
+        vector = RawSQL(
+            f'"{queryset.model._meta.db_table}"."search_vector"',
+            [],
+            output_field=SearchVectorField(),
+        )
+        return (
+            queryset
+            .alias(search_document=vector)
+            .filter(search_document=query)
+            .annotate(search_rank=SearchRank(vector, query, cover_density=True))
+        )
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    TABLE = "products_product_fts"
+
+    def search(self, queryset, term):
+        tokens = tokenize(term)
+        if not tokens:
+            return queryset.none()
+
+        match = " ".join(f'"{token}"*' for token in tokens)
+        product_table = queryset.model._meta.db_table
+        # bm25() отрицательный: меньше — лучше, поэтому разворачиваем знак;
+        # веса колонок (name, description) как A/B в Postgres
+        rank = RawSQL(
+            f"SELECT -bm25({self.TABLE}, 4.0, 1.0) FROM {self.TABLE} "
+            f"WHERE {self.TABLE} MATCH %s AND rowid = {product_table}.id",
+            [match],
+            output_field=FloatField(),
+        )
+        matched_ids = RawSQL(
+            f"SELECT rowid FROM {self.TABLE} WHERE {self.TABLE} MATCH %s",
+            [match],
+        )
+        return queryset.filter(id__in=matched_ids).annotate(search_rank=rank)
+
+    def update_product(self, product):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.TABLE} WHERE rowid = %s", [product.pk])
+            cursor.execute(
+                f"INSERT INTO {self.TABLE} (rowid, name, description) VALUES (%s, %s, %s)",
+                [product.pk, product.name, product.description],
+            )
+
+    def remove_product(self, product_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.TABLE} WHERE rowid = %s", [product_id])
+
+    def update_products(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+
+        placeholders = ", ".join(["%s"] * len(product_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.TABLE} WHERE rowid IN ({placeholders})",
+                product_ids,
+            )
+            cursor.execute(
+                f"INSERT INTO {self.TABLE} (rowid, name, description) "
+                f"SELECT id, name, description FROM products_product "
+                f"WHERE id IN ({placeholders})",
+                product_ids,
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.TABLE}")
+            cursor.execute(
+                f"INSERT INTO {self.TABLE} (rowid, name, description) "
+                f"SELECT id, name, description FROM products_product"
+            )
+
+
+_VENDOR_BACKENDS = {
+    "postgresql": PostgresSearchBackend,
+    "sqlite": SQLiteFTSSearchBackend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, "PRODUCT_SEARCH_BACKEND", None)
+        if path:
+            backend_class = import_string(path)
+        else:
+            backend_class = _VENDOR_BACKENDS.get(connection.vendor, IContainsSearchBackend)
+        _backend = backend_class()
+    return _backend
@@ -0,0 +1,335 @@
+"""
+Синтетический датасет для нагрузочного тестирования (seed_p --scale N).
+
+- детерминированно: пачка № k генерируется из random.Random(seed, k),
+  результат не зависит от числа процессов;
+- без сети: изображения — небольшой общий пул файлов, нарисованных Pillow
+  (варианты thumb/medium строятся один раз на файл пула);
+- только bulk_create: товары, атрибуты, картинки, отзывы, корзины и заказы
+  пачки пишутся в одной транзакции, rating / reviews_count считаются
+  сразу при генерации;
+- workers > 1 — пачки в пуле процессов (fork, каждый со своим соединением).
+"""
+import io
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils.text import slugify
+from PIL import Image, ImageDraw
+
+from .images import render_variants, variant_name
+from .models import Product, ProductAttribute, ProductAttributeValue, ProductImage
+
+SEED_EMAIL_DOMAIN = "seed.example.com"
+SEED_PASSWORD = "password123"
+IMAGE_POOL_DIR = "products/seed"
+
+_context = None
+
+
+def chunk_rng(seed, index):
+    return random.Random(f"{seed}:{index}")
+
+
+# ============================================================
+# VOCABULARY
+# ============================================================
+def build_vocabulary(seed):
+    """
+    Словари один раз через Faker, дальше — только random.Random.
+    Faker на каждую строку слишком медленный для миллионов товаров.
+    """
+    from faker import Faker
+
+    fake = Faker()
+    fake.seed_instance(seed)
+    return {
+        "words": [fake.word() for _ in range(1500)],
+        "brands": [fake.company().split()[0].strip(",") for _ in range(300)],
+        "colors": [fake.color_name() for _ in range(60)],
+        "first_names": [fake.first_name() for _ in range(400)],
+        "last_names": [fake.last_name() for _ in range(400)],
+        "sentences": [fake.sentence(nb_words=10) for _ in range(2000)],
+        "addresses": [fake.address().replace("\n", ", ") for _ in range(500)],
+    }
+
+
+# ============================================================
+# IMAGE POOL
+# ============================================================
+def build_image_pool(size, seed):
+    """
+    [(name, variants)] — общий пул картинок в storage.
+    Уже существующие файлы пула переиспользуются.
+    """
+    rng = chunk_rng(seed, "images")
+    pool = []
+    for index in range(size):
+        color = tuple(rng.randrange(40, 220) for _ in range(3))
+        accent = tuple(255 - c for c in color)
+        name = f"{IMAGE_POOL_DIR}/{index}.jpg"
+
+        if not default_storage.exists(name):
+            image = Image.new("RGB", (600, 600), color)
+            draw = ImageDraw.Draw(image)
+            draw.ellipse((150, 150, 450, 450), fill=accent)
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=85)
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+
+        with default_storage.open(name, "rb") as f:
+            rendered = render_variants(f.read())
+
+        variants = {}
+        for key, content in rendered.items():
+            variant = variant_name(name, key)
+            if not default_storage.exists(variant):
+                variant = default_storage.save(variant, ContentFile(content))
+            variants[key] = variant
+        pool.append((name, variants))
+    return pool
+
+
+# ============================================================
+# USERS
+# ============================================================
+def seed_users(count, seed, vocabulary, batch_size):
+    """
+    user<i>@seed.example.com + корзина. Пароль хэшируется один раз.
+    Возвращает [(id, email)] всех seed-пользователей.
+    """
+    from django.contrib.auth import get_user_model
+    from apps.cart.models import Cart
+
+    User = get_user_model()
+    rng = chunk_rng(seed, "users")
+    password = make_password(SEED_PASSWORD)
+
+    for start in range(0, count, batch_size):
+        users = [
+            User(
+                email=f"user{i}@{SEED_EMAIL_DOMAIN}",
+                password=password,
+                first_name=rng.choice(vocabulary["first_names"]),
+                last_name=rng.choice(vocabulary["last_names"]),
+            )
+            for i in range(start, min(start + batch_size, count))
+        ]
+        User.objects.bulk_create(users, ignore_conflicts=True)
+
+    users = list(
+        User.objects
+        .filter(email__endswith=f"@{SEED_EMAIL_DOMAIN}")
+        .order_by("id")
+        .values_list("id", "email")
+    )
+    Cart.objects.bulk_create(
+        [Cart(user_id=user_id) for user_id, _ in users],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    return users
+
+
+# ============================================================
+# PRODUCTS (per chunk)
+# ============================================================
+def _init_worker(context):
+    global _context
+    _context = context
+    # соединение родителя после fork использовать нельзя
+    connections.close_all()
+
+
+def _attribute_value(rng, attribute_id, value_type, slug, vocabulary):
+    value = ProductAttributeValue(attribute_id=attribute_id)
+    if value_type == ProductAttribute.NUMBER:
+        value.value_number = Decimal(rng.randrange(10, 500)) / 100
+    elif value_type == ProductAttribute.BOOLEAN:
+        value.value_bool = rng.choice([True, False, None])
+    elif slug == "brand":
+        value.value_text = rng.choice(vocabulary["brands"])
+    elif slug == "color":
+        value.value_text = rng.choice(vocabulary["colors"])
+    else:
+        value.value_text = rng.choice(vocabulary["words"])
+    return value
+
+
+def seed_chunk(index):
+    """
+    Товары [index * batch_size, ...) со всеми зависимыми строками.
+    """
+    from apps.cart.models import Cart, CartItem
+    from apps.orders.models import Order, OrderItem
+    from apps.reviews.models import Review
+    from .search import get_search_backend
+
+    ctx = _context
+    vocabulary = ctx["vocabulary"]
+    users = ctx["users"]
+    rng = chunk_rng(ctx["seed"], index)
+    started = time.monotonic()
+
+    start = index * ctx["batch_size"]
+    stop = min(start + ctx["batch_size"], ctx["products"])
+
+    products, reviews = [], []
+    for i in range(start, stop):
+        brand = rng.choice(vocabulary["brands"])
+        name = f"{brand} {rng.choice(vocabulary['words']).title()} {rng.choice(vocabulary['words'])}"
+        price = Decimal(rng.randrange(2000, 200000)) / 100
+
+        # отзывы генерируем сразу: rating / reviews_count без пересчёта
+        authors = rng.sample(users, k=min(rng.randrange(ctx["max_reviews"] + 1), len(users)))
+        ratings = [rng.choice((1, 2, 3, 3, 4, 4, 4, 5, 5, 5)) for _ in authors]
+        reviews.append([(user_id, rating) for (user_id, _), rating in zip(authors, ratings)])
+
+        image_name, image_variants = rng.choice(ctx["image_pool"])
+        products.append(Product(
+            category_id=rng.choice(ctx["categories"]),
+            name=name,
+            slug=f"{slugify(name)}-{i}",
+            description=" ".join(rng.sample(vocabulary["sentences"], 3)),
+            price=price,
+            old_price=(price * Decimal("1.2")).quantize(Decimal("0.01")) if rng.random() < 0.3 else None,
+            stock=rng.randrange(0, 200),
+            is_active=rng.random() < 0.97,
+            # ROUND_HALF_UP — как ROUND() в БД (ReviewStatsService)
+            rating=(
+                (Decimal(sum(ratings)) / len(ratings)).quantize(Decimal("0.1"), ROUND_HALF_UP)
+                if ratings else 0
+            ),
+            reviews_count=len(ratings),
+            rating_sum=sum(ratings),
+            **{f"stars_{star}": ratings.count(star) for star in range(1, 6)},
+            main_image=image_name,
+            main_image_variants=image_variants,
+        ))
+
+    with transaction.atomic():
+        # pk возвращаются (PostgreSQL, SQLite >= 3.35)
+        Product.objects.bulk_create(products)
+
+        values, images, review_rows = [], [], []
+        for product, product_reviews in zip(products, reviews):
+            for attribute_id, value_type, slug in ctx["attributes"]:
+                value = _attribute_value(rng, attribute_id, value_type, slug, vocabulary)
+                value.product_id = product.pk
+                values.append(value)
+
+            images.append(ProductImage(
+                product_id=product.pk,
+                image=product.main_image,
+                is_main=True,
+                variants=product.main_image_variants,
+            ))
+            for _ in range(rng.randrange(ctx["max_images"])):
+                image_name, image_variants = rng.choice(ctx["image_pool"])
+                images.append(ProductImage(product_id=product.pk, image=image_name, variants=image_variants))
+
+            review_rows.extend(
+                Review(
+                    product_id=product.pk,
+                    user_id=user_id,
+                    rating=rating,
+                    text=rng.choice(vocabulary["sentences"]),
+                )
+                for user_id, rating in product_reviews
+            )
+
+        ProductAttributeValue.objects.bulk_create(values)
+        ProductImage.objects.bulk_create(images)
+        Review.objects.bulk_create(review_rows)
+
+        # корзины: разные пользователи — пара (cart, product) не повторяется
+        cart_items = []
+        cart_users = rng.sample(users, k=min(len(users), int(len(products) * ctx["carts_ratio"])))
+        for user_id, _ in cart_users:
+            for product in rng.sample(products, k=min(len(products), rng.randint(1, 3))):
+                cart_items.append((user_id, product.pk, rng.randint(1, 3)))
+        cart_ids = dict(
+            Cart.objects
+            .filter(user_id__in={user_id for user_id, _, _ in cart_items})
+            .values_list("user_id", "id")
+        )
+        CartItem.objects.bulk_create([
+            CartItem(cart_id=cart_ids[user_id], product_id=product_id, quantity=quantity)
+            for user_id, product_id, quantity in cart_items
+        ])
+
+        # заказы: позиции из товаров этой же пачки
+        orders, order_lines = [], []
+        for n in range(int(len(products) * ctx["orders_ratio"])):
+            user_id, email = rng.choice(users)
+            lines = [
+                (product, rng.randint(1, 3))
+                for product in rng.sample(products, k=min(len(products), rng.randint(1, 4)))
+            ]
+            orders.append(Order(
+                user_id=user_id,
+                customer_email=email,
+                shipping_address=rng.choice(vocabulary["addresses"]),
+                phone_number=f"+1555{rng.randrange(10 ** 7):07d}",
+                delivery_method=Order.DeliveryMethod.DELIVERY,
+                status=rng.choice(Order.Status.values),
+                total_price=sum(product.price * qty for product, qty in lines),
+                idempotency_key=f"seed-{index}-{n}",
+                is_finalized=True,
+            ))
+            order_lines.append(lines)
+
+        Order.objects.bulk_create(orders)
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order_id=order.pk,
+                product_id=product.pk,
+                product_name=product.name,
+                price=product.price,
+                quantity=qty,
+            )
+            for order, lines in zip(orders, order_lines)
+            for product, qty in lines
+        ])
+
+        # bulk_create идёт мимо сигналов
+        get_search_backend().update_products([product.pk for product in products])
+
+    return len(products), time.monotonic() - started
+
+
+def run(context, workers, on_chunk=None):
+    """
+    Генерирует все пачки; on_chunk(done_products) — для прогресса.
+    """
+    chunks = range((context["products"] + context["batch_size"] - 1) // context["batch_size"])
+    done = 0
+
+    if workers <= 1:
+        _init_worker(context)
+        for index in chunks:
+            created, _ = seed_chunk(index)
+            done += created
+            if on_chunk:
+                on_chunk(done)
+        return done
+
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_worker,
+        initargs=(context,),
+    ) as pool:
+        for created, _ in pool.map(seed_chunk, chunks):
+            done += created
+            if on_chunk:
+                on_chunk(done)
+    return done
@@ -1,6 +1,11 @@
+from operator import attrgetter
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import filepath_to_uri
 from rest_framework import serializers
 from .models import Category, Product, ProductImage, ProductAttribute, ProductAttributeValue
 
+IMAGE_STORAGE = ProductImage._meta.get_field("image").storage
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -18,22 +23,51 @@ class CategorySerializer(serializers.ModelSerializer):
         )
 
     def get_children(self, obj):
-        return CategorySerializer(
-            obj.children.filter(is_active=True),
-            many=True
-        ).data
+        # фильтруем в Python, чтобы не ломать prefetch_related("children")
+        children = [child for child in obj.children.all() if child.is_active]
+        return CategorySerializer(children, many=True).data
+
+
+
+def media_url_builder(request):
+    """
+    name → (абсолютный) URL файла. Для FileSystemStorage префикс считается
+    один раз, а не storage.url() + build_absolute_uri() на каждый файл.
+    """
+    if isinstance(IMAGE_STORAGE, FileSystemStorage):
+        prefix = IMAGE_STORAGE.base_url
+        if request:
+            prefix = request.build_absolute_uri(prefix)
+        return lambda name: prefix + filepath_to_uri(name)
 
+    if request:
+        return lambda name: request.build_absolute_uri(IMAGE_STORAGE.url(name))
+    return IMAGE_STORAGE.url
+
+
+def variant_urls(variants, request):
+    """
+    {"thumb_webp": name, ...} → {"thumb_webp": absolute url, ...}
+    """
+    build_url = media_url_builder(request)
+    return {key: build_url(name) for key, name in (variants or {}).items()}
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
-        fields = ('id', 'image', 'is_main')
+        fields = ('id', 'image', 'is_main', 'variants')
+
+    def get_variants(self, obj):
+        return variant_urls(obj.variants, self.context.get("request"))
 
 
 
 class ProductListSerializer(serializers.ModelSerializer):
     main_image = serializers.SerializerMethodField()
+    main_image_variants = serializers.SerializerMethodField()
     reviews_count = serializers.IntegerField(read_only=True)
 
     class Meta:
@@ -43,22 +77,77 @@ class ProductListSerializer(serializers.ModelSerializer):
             "name",
             "price",
             "main_image",
+            "main_image_variants",
             "reviews_count",
         )
 
     def get_main_image(self, obj):
-        # если prefetch_related использован — obj.images.all() уже закэширован
-        images = list(getattr(obj, "images").all()) if hasattr(obj, "images") else []
-        if images:
-            request = self.context.get("request")
-            url = images[0].image.url
-            if request:
-                return request.build_absolute_uri(url)
-            return url
-        return None
+        # денормализованное имя файла — без prefetch картинок
+        if not obj.main_image:
+            return None
+
+        url = IMAGE_STORAGE.url(obj.main_image)
+        request = self.context.get("request")
+        if request:
+            return request.build_absolute_uri(url)
+        return url
+
+    def get_main_image_variants(self, obj):
+        return variant_urls(obj.main_image_variants, self.context.get("request"))
+
+
+class ProductListProjection:
+    """
+    Быстрый read-only путь списка: values() вместо моделей и полей DRF.
+    Вывод совпадает с ProductListSerializer (он остаётся для схемы / записи).
+    """
+    fields = ("id", "name", "price", "main_image", "main_image_variants", "reviews_count")
+
+    @classmethod
+    def project(cls, queryset):
+        """
+        Только нужные колонки + поля сортировки (для keyset-курсора).
+        """
+        ordering = [
+            f.lstrip("-") for f in queryset.query.order_by
+            if isinstance(f, str)
+        ]
+        extra = [f for f in ordering if f not in cls.fields and f != "pk"]
+        return queryset.values(*cls.fields, *extra)
+
+    @staticmethod
+    def serialize(rows, request=None):
+        build_url = media_url_builder(request)
+        return [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "price": str(row["price"]),
+                "main_image": build_url(row["main_image"]) if row["main_image"] else None,
+                "main_image_variants": {
+                    key: build_url(name)
+                    for key, name in (row["main_image_variants"] or {}).items()
+                },
+                "reviews_count": row["reviews_count"],
+            }
+            for row in rows
+        ]
+
+
+BOOL_DISPLAY = {True: "yes", False: "no", None: "unknown"}
+
+# value_type → значение; таблица вместо цепочки if на каждую строку
+ATTRIBUTE_VALUE_GETTERS = {
+    ProductAttribute.TEXT: attrgetter("value_text"),
+    ProductAttribute.NUMBER: attrgetter("value_number"),
+    ProductAttribute.BOOLEAN: lambda obj: BOOL_DISPLAY[obj.value_bool],
+}
 
 
 class ProductAttributeValueSerializer(serializers.ModelSerializer):
+    """
+    Ожидает select_related("attribute") (см. ProductViewSet.get_queryset).
+    """
     attribute = serializers.CharField(source="attribute.name", read_only=True)
     slug = serializers.CharField(source="attribute.slug", read_only=True)
     value = serializers.SerializerMethodField()
@@ -67,23 +156,18 @@ class ProductAttributeValueSerializer(serializers.ModelSerializer):
         model = ProductAttributeValue
         fields = ("attribute", "slug", "value")
 
-    def get_value(self, obj):
-        attr_type = obj.attribute.value_type
-
-        if attr_type == ProductAttribute.TEXT:
-            return obj.value_text
+    def to_representation(self, obj):
+        # read-only и плоский: без обхода полей DRF
+        attribute = obj.attribute
+        return {
+            "attribute": attribute.name,
+            "slug": attribute.slug,
+            "value": self.get_value(obj),
+        }
 
-        if attr_type == ProductAttribute.NUMBER:
-            return obj.value_number
-
-        if attr_type == ProductAttribute.BOOLEAN:
-            if obj.value_bool is True:
-                return "yes"
-            if obj.value_bool is False:
-                return "no"
-            return "unknown"
-
-        return None
+    def get_value(self, obj):
+        getter = ATTRIBUTE_VALUE_GETTERS.get(obj.attribute.value_type)
+        return getter(obj) if getter else None
 
 
 class ProductDetailSerializer(serializers.ModelSerializer):
@@ -0,0 +1,411 @@
+import logging
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import (
+    Case,
+    Count,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    Max,
+    Min,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.common.cache import bump_version, versioned_key
+from .models import (
+    Category,
+    Product,
+    ProductAttribute,
+    ProductAttributeValue,
+    ProductCoPurchase,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryTreeService:
+    """
+    Дерево активных категорий: один плоский запрос → вложенные dict-узлы
+    со сводкой товаров по поддереву (products_count, min/max price).
+    Результат лежит в версионированном кэше, версия поднимается
+    сигналами Category (save/delete).
+    """
+
+    CACHE_NAME = "category_tree"
+    CACHE_TIMEOUT = 60 * 60 * 24
+
+    @staticmethod
+    def build():
+        rows = (
+            Category.objects
+            .filter(is_active=True)
+            .order_by("name", "id")
+            .values_list(
+                "id", "name", "slug", "parent_id",
+                "own_products_count", "own_min_price", "own_max_price",
+            )
+        )
+
+        nodes, own = {}, {}
+        for pk, name, slug, parent_id, count, min_price, max_price in rows:
+            nodes[pk] = {
+                "id": pk,
+                "name": name,
+                "slug": slug,
+                "parent": parent_id,
+                "products_count": 0,
+                "min_price": None,
+                "max_price": None,
+                "children": [],
+            }
+            own[pk] = (count, min_price, max_price)
+
+        roots = []
+        for node in nodes.values():
+            parent_id = node["parent"]
+            if parent_id is None:
+                roots.append(node)
+            elif parent_id in nodes:
+                nodes[parent_id]["children"].append(node)
+            # иначе родитель неактивен — ветка скрыта целиком
+
+        for root in roots:
+            CategoryTreeService._roll_up(root, own)
+        return roots
+
+    @staticmethod
+    def _roll_up(node, own):
+        """
+        products_count / min_price / max_price узла = своё + все видимые потомки.
+        """
+        count, low, high = own[node["id"]]
+        for child in node["children"]:
+            CategoryTreeService._roll_up(child, own)
+            count += child["products_count"]
+            if child["products_count"]:
+                child_low, child_high = Decimal(child["min_price"]), Decimal(child["max_price"])
+                low = child_low if low is None else min(low, child_low)
+                high = child_high if high is None else max(high, child_high)
+
+        node["products_count"] = count
+        node["min_price"] = str(low) if low is not None else None
+        node["max_price"] = str(high) if high is not None else None
+
+    @classmethod
+    def get_tree_entry(cls):
+        """
+        (ключ, {"tree", "built_at"}): ключ содержит версию дерева,
+        built_at (unix time) — для ETag / Last-Modified.
+        """
+        key = versioned_key(cls.CACHE_NAME, "entry")
+        entry = cache.get(key)
+        if entry is None:
+            entry = {"tree": cls.build(), "built_at": int(time.time())}
+            cache.set(key, entry, timeout=cls.CACHE_TIMEOUT)
+            logger.info("category_tree_rebuilt", extra={"roots": len(entry["tree"])})
+        return key, entry
+
+    @classmethod
+    def get_tree(cls):
+        return cls.get_tree_entry()[1]["tree"]
+
+    @classmethod
+    def invalidate(cls):
+        bump_version(cls.CACHE_NAME)
+
+
+class CategoryStatsService:
+    """
+    Category.own_* — число активных товаров и диапазон цен самой категории.
+    refresh(ids) — инкрементально (сигналы Product), refresh() — все категории;
+    один GROUP BY + bulk_update мимо сигналов Category.
+    Свёртка по иерархии — в CategoryTreeService.build().
+    """
+
+    FIELDS = ["own_products_count", "own_min_price", "own_max_price"]
+
+    @classmethod
+    def refresh(cls, category_ids=None):
+        products = Product.objects.filter(is_active=True)
+        categories = Category.objects.only("id")
+        if category_ids is not None:
+            category_ids = set(category_ids)
+            products = products.filter(category_id__in=category_ids)
+            categories = categories.filter(pk__in=category_ids)
+
+        stats = {
+            row["category_id"]: row
+            for row in (
+                products
+                .values("category_id")
+                .annotate(count=Count("id"), min=Min("price"), max=Max("price"))
+                .order_by()
+            )
+        }
+
+        changed = []
+        for category in categories.iterator(chunk_size=1000):
+            row = stats.get(category.pk, {})
+            category.own_products_count = row.get("count", 0)
+            category.own_min_price = row.get("min")
+            category.own_max_price = row.get("max")
+            changed.append(category)
+        Category.objects.bulk_update(changed, cls.FIELDS, batch_size=500)
+
+        transaction.on_commit(CategoryTreeService.invalidate)
+        return len(changed)
+
+    @classmethod
+    def schedule(cls, category_ids):
+        """
+        Пересчёт после коммита: одна агрегация по затронутым категориям.
+        """
+        category_ids = set(category_ids) - {None}
+        if category_ids:
+            transaction.on_commit(lambda: cls.refresh(category_ids))
+
+
+class ProductFacetService:
+    """
+    Фасеты по атрибутам для текущей выборки товаров.
+    Фиксированное число запросов на выборку (2) независимо от числа атрибутов:
+    - text/bool: GROUP BY (attribute, value) → count
+    - number: GROUP BY attribute → min / max / count
+    плюс метаданные атрибутов.
+
+    Атрибут, по которому уже фильтруют (?attr.color=red,blue), считается
+    по выборке без его собственного фильтра (attribute_querysets) —
+    иначе у невыбранных значений 0 и выбор нельзя расширить.
+    """
+
+    VALUES_LIMIT = 50
+
+    @staticmethod
+    def _aggregate(queryset, attribute_filter):
+        values = ProductAttributeValue.objects.filter(
+            product__in=queryset.order_by().values("pk"),
+            **attribute_filter,
+        )
+
+        counts = (
+            values
+            .exclude(attribute__value_type=ProductAttribute.NUMBER)
+            .values("attribute_id", "attribute__slug", "value_text", "value_bool")
+            .annotate(count=Count("id"))
+            .order_by("attribute_id", "-count")
+        )
+        ranges = (
+            values
+            .filter(
+                attribute__value_type=ProductAttribute.NUMBER,
+                value_number__isnull=False,
+            )
+            .values("attribute_id", "attribute__slug")
+            .annotate(
+                min=Min("value_number"),
+                max=Max("value_number"),
+                count=Count("id"),
+            )
+            .order_by()
+        )
+        return list(counts), list(ranges)
+
+    @classmethod
+    def get_facets(cls, queryset, attribute_querysets=None):
+        """
+        attribute_querysets: {slug: выборка со всеми фильтрами, кроме фильтра этого атрибута}
+        """
+        attribute_querysets = attribute_querysets or {}
+
+        # атрибуты без собственного фильтра — одним проходом по выборке
+        counts, ranges = cls._aggregate(queryset, {})
+        counts = [row for row in counts if row["attribute__slug"] not in attribute_querysets]
+        ranges = [row for row in ranges if row["attribute__slug"] not in attribute_querysets]
+
+        # отфильтрованные — каждый по своей выборке
+        for slug, attribute_queryset in attribute_querysets.items():
+            own_counts, own_ranges = cls._aggregate(attribute_queryset, {"attribute__slug": slug})
+            counts.extend(own_counts)
+            ranges.extend(own_ranges)
+
+        buckets = {}
+        for row in counts:
+            value = row["value_bool"] if row["value_bool"] is not None else row["value_text"]
+            if value == "" or value is None:
+                continue
+            bucket = buckets.setdefault(row["attribute_id"], [])
+            if len(bucket) < cls.VALUES_LIMIT:
+                bucket.append({"value": value, "count": row["count"]})
+
+        number_ranges = {row["attribute_id"]: row for row in ranges}
+
+        attributes = ProductAttribute.objects.filter(
+            pk__in=set(buckets) | set(number_ranges)
+        ).order_by("name")
+
+        facets = []
+        for attr in attributes:
+            facet = {
+                "slug": attr.slug,
+                "name": attr.name,
+                "type": attr.value_type,
+                "unit": attr.unit,
+            }
+            if attr.pk in number_ranges:
+                row = number_ranges[attr.pk]
+                facet.update(min=row["min"], max=row["max"], count=row["count"])
+            else:
+                facet["values"] = buckets[attr.pk]
+            facets.append(facet)
+        return facets
+
+
+class CoPurchaseService:
+    """
+    Индекс «покупают вместе» (ProductCoPurchase):
+    - record_order() — инкремент пар одного заказа (после коммита checkout);
+    - rebuild() — полный пересчёт одним INSERT ... SELECT (self-join OrderItem
+      с GROUP BY внутри БД, без выгрузки заказов в Python).
+    Top-N читается одним индексным запросом (ProductViewSet.related).
+    """
+
+    # на огромных заказах число пар растёт квадратично
+    MAX_ORDER_PRODUCTS = 50
+
+    @classmethod
+    def record_order(cls, product_ids):
+        product_ids = sorted(set(product_ids))[:cls.MAX_ORDER_PRODUCTS]
+        if len(product_ids) < 2:
+            return
+
+        pairs = ProductCoPurchase.objects.filter(
+            product_id__in=product_ids,
+            related_id__in=product_ids,
+        ).exclude(product_id=F("related_id"))
+
+        with transaction.atomic():
+            # недостающие пары с count=0, затем +1 всем: инкремент не теряется,
+            # даже если пару параллельно вставил другой заказ
+            ProductCoPurchase.objects.bulk_create(
+                [
+                    ProductCoPurchase(product_id=a, related_id=b)
+                    for a in product_ids
+                    for b in product_ids
+                    if a != b
+                ],
+                ignore_conflicts=True,
+            )
+            # блокировка в детерминированном порядке (как в checkout)
+            list(
+                pairs.select_for_update()
+                .order_by("product_id", "related_id")
+                .values_list("id", flat=True)
+            )
+            pairs.update(count=F("count") + 1)
+
+    @classmethod
+    def schedule_order(cls, product_ids):
+        """
+        Вызывать внутри транзакции заказа: индекс обновится после коммита,
+        вне критической секции checkout. Ошибка не ломает заказ —
+        рассинхрон исправит rebuild_co_purchases.
+        """
+        product_ids = list(product_ids)
+
+        def record():
+            try:
+                cls.record_order(product_ids)
+            except Exception:
+                logger.exception("co_purchase_update_failed", extra={"product_ids": product_ids})
+
+        transaction.on_commit(record)
+
+    @staticmethod
+    def rebuild():
+        from apps.orders.models import OrderItem
+
+        pairs = (
+            OrderItem.objects
+            .filter(order__is_finalized=True)
+            # annotate — один JOIN на вторую копию позиций заказа
+            .annotate(related=F("order__items__product_id"))
+            .exclude(related=F("product_id"))
+            .values("product_id", "related")
+            .annotate(count=Count("order_id", distinct=True))
+            .order_by()
+        )
+        sql, params = pairs.query.sql_with_params()
+        table = connection.ops.quote_name(ProductCoPurchase._meta.db_table)
+
+        with transaction.atomic():
+            ProductCoPurchase.objects.all().delete()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} (product_id, related_id, count) {sql}",
+                    params,
+                )
+                return cursor.rowcount
+
+
+class PopularityService:
+    """
+    Product.popularity = Σ quantity × 0.5 ** (возраст заказа в днях / half_life)
+    по позициям оформленных (is_finalized) и не отменённых заказов
+    за окно window_days.
+
+    Один UPDATE с коррелированным подзапросом; вес — CASE по дневным
+    корзинам (переносимо между PostgreSQL и SQLite, без EXP / интервалов).
+    Обновляются только товары с продажами в окне и те, у кого score был > 0.
+    """
+
+    WINDOW_DAYS = 30
+    HALF_LIFE_DAYS = 7
+
+    @classmethod
+    def refresh(cls, window_days=WINDOW_DAYS, half_life_days=HALF_LIFE_DAYS):
+        from apps.orders.models import Order, OrderItem
+
+        now = timezone.now()
+        since = now - timedelta(days=window_days)
+
+        weight = Case(
+            *[
+                When(
+                    order__created_at__gte=now - timedelta(days=day + 1),
+                    then=Value(0.5 ** (day / half_life_days)),
+                )
+                for day in range(window_days)
+            ],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        sold = (
+            OrderItem.objects
+            .filter(order__is_finalized=True, order__created_at__gte=since)
+            .exclude(order__status=Order.Status.CANCELLED)
+        )
+        scores = (
+            sold
+            .filter(product_id=OuterRef("pk"))
+            .values("product_id")
+            .annotate(score=Sum(ExpressionWrapper(F("quantity") * weight, output_field=FloatField())))
+            .values("score")
+        )
+
+        return (
+            Product.objects
+            .filter(Q(popularity__gt=0) | Q(pk__in=sold.values("product_id")))
+            .update(popularity=Coalesce(Subquery(scores), Value(0.0)))
+        )
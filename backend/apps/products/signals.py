@@ -1,42 +1,48 @@
 import logging
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
 from django.dispatch import receiver
-from .models import ProductImage
+from .models import (
+    Category,
+    Product,
+    ProductAttribute,
+    ProductAttributeValue,
+    ProductImage,
+)
+from .autocomplete import INDEXED_FIELDS, AutocompleteIndex
+from .cache import invalidate_catalog, invalidate_product
+from .cleanup import queue_image_files
+from .images import schedule_variants
+from .search import INDEXED_FIELDS as SEARCH_FIELDS, get_search_backend
+from .services import CategoryStatsService, CategoryTreeService
 from django.db import transaction
 
 logger = logging.getLogger("products.signals")
 
+# поля товара, от которых зависят own_* агрегаты категории
+CATEGORY_STATS_FIELDS = {"price", "is_active", "category", "category_id"}
+# остаток в выдаче не отдаётся — от него зависит только фильтр in_stock
+STOCK_FIELDS = {"stock"}
 
-def _delete_file(file_field):
-    if not file_field:
-        return
 
-    try:
-        storage = file_field.storage
-        name = file_field.name
+def _loaded_name(instance):
+    # из __dict__: не трогаем дескриптор (и отложенное поле при only())
+    value = instance.__dict__.get("image")
+    return getattr(value, "name", value) or ""
 
-        if name and storage.exists(name):
-            storage.delete(name)
 
-    except Exception as exc:
-        logger.error(
-            "file_delete_failed",
-            extra={
-                "file": getattr(file_field, "name", None),
-                "error": str(exc),
-            },
-            exc_info=True,
-        )
+@receiver(post_init, sender=ProductImage)
+def remember_image_name(sender, instance, **kwargs):
+    # имя файла из БД — чтобы заметить замену без SELECT в pre_save
+    instance._loaded_image_name = _loaded_name(instance) if instance.pk else ""
+    instance._loaded_variants = instance.__dict__.get("variants")
 
 
 @receiver(post_delete, sender=ProductImage)
 def delete_image_file_on_delete(sender, instance, **kwargs):
     """
-    Удаляет файл при удалении ProductImage.
+    Ставит файл (и его производные) в очередь удаления.
     """
-    image = instance.image 
-    
-    transaction.on_commit(lambda: _delete_file(image))
+    queue_image_files(instance.image.name, instance.variants)
 
     logger.info(
         "product_image_deleted",
@@ -48,26 +54,165 @@ def delete_image_file_on_delete(sender, instance, **kwargs):
 
 
 @receiver(pre_save, sender=ProductImage)
-def delete_old_image_on_update(sender, instance, **kwargs):
+def detect_image_replace(sender, instance, **kwargs):
+    """
+    Замена файла: старый уйдёт в очередь удаления в post_save
+    (после успешного UPDATE), производные пересоздадутся.
+    """
+    old_name = getattr(instance, "_loaded_image_name", "")
+    if not instance.pk or not old_name or old_name == instance.image.name:
+        return
+
+    instance._replaced_image = (old_name, instance._loaded_variants)
+    instance.variants = {}
+    instance._image_changed = True
+
+    logger.info(
+        "product_image_replaced",
+        extra={
+            "product_id": instance.product_id,
+            "image_id": instance.id,
+        },
+    )
+
+
+@receiver(post_save, sender=ProductImage)
+def queue_replaced_image_files(sender, instance, **kwargs):
+    replaced = getattr(instance, "_replaced_image", None)
+    if replaced:
+        queue_image_files(*replaced)
+        instance._replaced_image = None
+
+    instance._loaded_image_name = instance.image.name or ""
+    instance._loaded_variants = instance.variants
+
+
+@receiver(post_save, sender=ProductImage)
+def generate_image_variants(sender, instance, created, **kwargs):
+    """
+    Thumbnail / WebP / AVIF — фоном после коммита (см. images.py).
+    """
+    if not instance.image:
+        return
+
+    if created or getattr(instance, "_image_changed", False):
+        instance._image_changed = False
+        image_id = instance.pk
+        transaction.on_commit(lambda: schedule_variants(image_id))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_tree(sender, instance, **kwargs):
     """
-    Удаляет старый файл при обновлении изображения.
+    Сбрасывает кэш дерева категорий после коммита.
     """
-    if not instance.pk:
+    transaction.on_commit(CategoryTreeService.invalidate)
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_index(sender, instance, update_fields=None, **kwargs):
+    # checkout сохраняет только stock под блокировкой строк — FTS не трогаем
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
         return
+    get_search_backend().update_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_search_index(sender, instance, **kwargs):
+    get_search_backend().remove_product(instance.pk)
+
 
-    try:
-        old = ProductImage.objects.get(pk=instance.pk)
-    except ProductImage.DoesNotExist:
+@receiver(post_save, sender=Product)
+def invalidate_autocomplete_on_save(sender, instance, update_fields=None, **kwargs):
+    # остаток / цена меняются постоянно — индекс от них не зависит
+    if update_fields is not None and not INDEXED_FIELDS & set(update_fields):
         return
+    AutocompleteIndex.invalidate()
+
+
+@receiver(post_delete, sender=Product)
+def invalidate_autocomplete_on_delete(sender, instance, **kwargs):
+    AutocompleteIndex.invalidate()
+
+
+# ---- RESPONSE CACHE INVALIDATION ----
+@receiver(post_init, sender=Product)
+def remember_product_category(sender, instance, **kwargs):
+    # старая категория нужна, чтобы сбросить и её выдачу при переносе товара
+    instance._loaded_category_id = instance.category_id
+    # остаток из БД — заметить переход через 0 (из __dict__: без догрузки при only())
+    instance._loaded_stock = instance.__dict__.get("stock")
+
+
+# ---- CATEGORY STATS ----
+# до invalidate_product_cache: тот обновляет _loaded_category_id
+@receiver(post_save, sender=Product)
+def refresh_category_stats_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not CATEGORY_STATS_FIELDS & set(update_fields):
+        return
+    CategoryStatsService.schedule(
+        {instance.category_id, getattr(instance, "_loaded_category_id", None)}
+    )
+
+
+@receiver(post_delete, sender=Product)
+def refresh_category_stats_on_delete(sender, instance, **kwargs):
+    CategoryStatsService.schedule({instance.category_id})
+
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_cache(sender, instance, update_fields=None, **kwargs):
+    loaded_stock = getattr(instance, "_loaded_stock", None)
+    instance._loaded_stock = instance.__dict__.get("stock")
+
+    # checkout: save(update_fields=["stock"]) — списки не трогаем,
+    # пока товар не появился / не пропал из ?in_stock=
+    if (
+        update_fields is not None
+        and set(update_fields) <= STOCK_FIELDS
+        and loaded_stock is not None
+        and (loaded_stock > 0) == (instance.stock > 0)
+    ):
+        invalidate_product(instance.pk)
+        return
+
+    category_ids = {instance.category_id, getattr(instance, "_loaded_category_id", None)}
+    category_paths = []
+    # категория уже загружена (select_related) — путь без запроса к Category
+    if Product.category.is_cached(instance) and instance.category is not None:
+        category_paths.append(instance.category.path)
+        category_ids.discard(instance.category.pk)
+
+    invalidate_product(
+        instance.pk,
+        listing=True,
+        category_ids=category_ids - {None},
+        category_paths=category_paths,
+    )
+    instance._loaded_category_id = instance.category_id
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def invalidate_product_image_cache(sender, instance, **kwargs):
+    invalidate_product(instance.product_id)
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def update_product_main_image(sender, instance, **kwargs):
+    """
+    Поддерживает Product.main_image для списка товаров.
+    """
+    Product.refresh_main_image(instance.product_id)
+
+
+@receiver([post_save, post_delete], sender=ProductAttributeValue)
+def invalidate_product_attribute_cache(sender, instance, **kwargs):
+    # атрибуты участвуют в фильтрах и фасетах выдачи
+    invalidate_product(instance.product_id, listing=True)
+
 
-    if old.image and old.image != instance.image:
-        old_image = old.image 
-        transaction.on_commit(lambda: _delete_file(old_image))
-        
-        logger.info(
-            "product_image_replaced",
-            extra={
-                "product_id": instance.product_id,
-                "image_id": instance.id,
-            },
-        )
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=ProductAttribute)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    invalidate_catalog()
@@ -1,3 +1,81 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from .models import Category, Product
+
+
+class ImportProductsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Category.objects.create(name="Phones", slug="phones")
+
+    def import_jsonl(self, *rows):
+        fd, path = tempfile.mkstemp(suffix=".jsonl")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write((row if isinstance(row, str) else json.dumps(row)) + "\n")
+        self.addCleanup(os.remove, path)
+
+        stderr = StringIO()
+        call_command("import_products", path, stdout=StringIO(), stderr=stderr)
+        return stderr.getvalue()
+
+    def valid_row(self, slug="ok", **fields):
+        return {"slug": slug, "category": "phones", "price": "10", **fields}
+
+    def test_non_object_rows_are_reported_per_row(self):
+        errors = self.import_jsonl("[1, 2]", "42", "null", self.valid_row())
+
+        self.assertIn("line 1: expected an object, got list", errors)
+        self.assertIn("line 2: expected an object, got int", errors)
+        self.assertIn("line 3: expected an object, got NoneType", errors)
+        self.assertEqual(list(Product.objects.values_list("slug", flat=True)), ["ok"])
+
+    def test_non_string_text_fields_are_reported_per_row(self):
+        errors = self.import_jsonl(
+            {"slug": 123, "category": "phones", "price": "10"},
+            {"slug": "a", "category": ["phones"], "price": "10"},
+            self.valid_row("b", name=7),
+            self.valid_row(),
+        )
+
+        self.assertIn("line 1: slug: expected a string, got int", errors)
+        self.assertIn("line 2: category: expected a string, got list", errors)
+        self.assertIn("line 3: name: expected a string, got int", errors)
+        self.assertEqual(list(Product.objects.values_list("slug", flat=True)), ["ok"])
+
+    def test_non_integer_stock_is_reported_per_row(self):
+        errors = self.import_jsonl(
+            self.valid_row("a", stock=2.7),
+            self.valid_row("b", stock=True),
+            self.valid_row("c", stock="2.7"),
+            self.valid_row(stock=3.0),
+        )
+
+        self.assertIn("line 1: stock: invalid integer 2.7", errors)
+        self.assertIn("line 2: stock: invalid integer True", errors)
+        self.assertIn("line 3: stock: invalid integer '2.7'", errors)
+        self.assertEqual(
+            list(Product.objects.values_list("slug", "stock")),
+            [("ok", 3)],
+        )
+
+    def test_decimals_are_validated_and_quantized(self):
+        errors = self.import_jsonl(
+            self.valid_row("a", price="NaN"),
+            self.valid_row("b", price="Infinity"),
+            self.valid_row("c", price="123456789"),
+            self.valid_row(price="10.005"),
+        )
+
+        self.assertIn("line 1: price: invalid number 'NaN'", errors)
+        self.assertIn("line 2: price: invalid number 'Infinity'", errors)
+        self.assertIn("line 3: price: '123456789' is out of range", errors)
+        self.assertEqual(Product.objects.get().price, Decimal("10.01"))
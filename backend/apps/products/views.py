@@ -1,17 +1,27 @@
-from django.db.models import Count, Prefetch
-from django.views.decorators.cache import cache_page
-from django.utils.decorators import method_decorator
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
 from rest_framework.viewsets import ReadOnlyModelViewSet, ModelViewSet
 from rest_framework.pagination import PageNumberPagination
-from rest_framework import filters
+from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
 from django_filters.rest_framework import DjangoFilterBackend
-from .filters import ProductFilter
+from .filters import ProductFilter, ProductOrderingFilter, ProductSearchFilter
+from .pagination import KeysetPagination
+from .services import CategoryTreeService, ProductFacetService
+from apps.common.http import conditional_response, make_etag
+from .autocomplete import AutocompleteIndex
+from .cache import CATALOG_TAG, ProductResponseCache, category_tag, product_tag
+from .export import CONTENT_TYPES, EXPORT_FORMATS, iter_products, render
 
-from .models import Category, Product, ProductImage
+from .models import Category, Product, ProductAttributeValue, ProductImage
 from .serializers import (
     CategorySerializer,
     ProductDetailSerializer,
+    ProductListProjection,
     ProductListSerializer,
 )
 
@@ -29,39 +39,55 @@ class ProductViewSet(ModelViewSet):
     """
     Product catalog API:
     - filtering (category, price, stock)
-    - search (name, description)
-    - ordering (price, rating, created_at)
-    - pagination
-    - caching (list + retrieve)
+    - full-text search (name, description), relevance ordering
+    - ordering (price, rating, created_at, popularity)
+    - pagination (page number; keyset when ?cursor= is passed)
+    - caching (list + retrieve, tag-based invalidation — see cache.py),
+      ETag / Last-Modified with 304 on conditional GET
     """
     pagination_class = StandardResultsPagination
 
     # фильтры
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
-        filters.OrderingFilter,
+        ProductSearchFilter,
+        ProductOrderingFilter,
     ]
 
     filterset_class = ProductFilter      # ВАЖНО: используем свой фильтр
     search_fields = ["name", "description"]
-    ordering_fields = ["price", "rating", "created_at"]
+    ordering_fields = ["price", "rating", "created_at", "popularity"]
     ordering = ["-created_at"]
 
+    @property
+    def paginator(self):
+        """
+        ?cursor= включает keyset-пагинацию (без COUNT и OFFSET)
+        """
+        if not hasattr(self, "_paginator"):
+            if KeysetPagination.cursor_query_param in self.request.query_params:
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     # ---- QUERYSET ----
     def get_queryset(self):
-        qs = (
-            Product.objects
-            .select_related("category")
-            .prefetch_related(
+        qs = Product.objects.select_related("category")
+
+        # списку хватает Product.main_image, галерея нужна только карточке
+        if self.action not in ("list", "export"):
+            qs = qs.prefetch_related(
                 Prefetch(
                     "images",
                     queryset=ProductImage.objects.order_by("-is_main", "id")
-                )
+                ),
+                # значения + метаданные атрибута одним JOIN-запросом
+                Prefetch(
+                    "attributes",
+                    queryset=ProductAttributeValue.objects.select_related("attribute").order_by("id")
+                ),
             )
-            .annotate(reviews_count=Count("reviews", distinct=True))
-        )
 
         user = self.request.user
         # staff видит всё
@@ -83,28 +109,213 @@ class ProductViewSet(ModelViewSet):
     
     def list(self, request, *args, **kwargs):
         """
-        Cache product list for 60 seconds
+        Cached product list (tags: catalog, category, products on page)
+        ?facets=1 — добавить фасеты атрибутов по всей отфильтрованной выборке
         """
-        return super().list(request, *args, **kwargs)
-    
-    @method_decorator(cache_page(300))
+        return ProductResponseCache.cached_response(
+            request,
+            "list",
+            lambda: ProductResponseCache.list_tags(request),
+            self._build_list,
+        )
+
+    def _build_list(self):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        # values() + ProductListProjection вместо моделей и ProductListSerializer
+        rows = ProductListProjection.project(queryset)
+
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(ProductListProjection.serialize(rows, self.request)), []
+
+        response = self.get_paginated_response(
+            ProductListProjection.serialize(page, self.request)
+        )
+
+        if self.request.query_params.get("facets") in ("1", "true"):
+            response.data["facets"] = ProductFacetService.get_facets(
+                queryset,
+                self._facet_querysets(),
+            )
+        return response, [product_tag(row["id"]) for row in page]
+
+    def _facet_querysets(self):
+        """
+        {slug: выборка со всеми фильтрами, кроме ?attr.<slug>} —
+        фасет выбранного атрибута показывает и невыбранные значения.
+        """
+        request = self.request
+        querysets = {}
+        for slug in ProductFilter.attribute_slugs(request.query_params):
+            queryset = ProductFilter(
+                request.query_params,
+                queryset=self.get_queryset(),
+                request=request,
+                skip_attribute=slug,
+            ).qs
+            querysets[slug] = ProductSearchFilter().filter_queryset(request, queryset, self)
+        return querysets
+
     def retrieve(self, request, *args, **kwargs):
         """
-        Cache product detail for 5 minutes
+        Cached product detail (tags: catalog, product)
+        """
+        return ProductResponseCache.cached_response(
+            request,
+            "retrieve",
+            lambda: ProductResponseCache.detail_tags(kwargs[self.lookup_field]),
+            lambda: (super(ProductViewSet, self).retrieve(request, *args, **kwargs), []),
+        )
+
+    @action(detail=False, methods=["get"], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """
+        Staff-only streaming export of the whole (filtered) catalog.
+        ?file_format=ndjson (default) | csv; фильтры — как у списка.
+        """
+        fmt = request.query_params.get("file_format", "ndjson")
+        if fmt not in EXPORT_FORMATS:
+            raise ValidationError({"file_format": f"Expected one of: {', '.join(EXPORT_FORMATS)}"})
+
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            render(iter_products(queryset), fmt),
+            content_type=CONTENT_TYPES[fmt],
+        )
+        response["Content-Disposition"] = f'attachment; filename="products.{fmt}"'
+        return response
+
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        """
+        Search-box suggestions (categories, then products) from the
+        in-process prefix index — без запросов к БД. ?q=, ?limit= (до 20).
+        """
+        query = request.query_params.get("q", "")
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 20)
+        except ValueError:
+            raise ValidationError({"limit": "Expected an integer"})
+
+        if len(query.strip()) < 2:
+            return Response({"results": []})
+        return Response({"results": AutocompleteIndex.search(query, limit)})
+
+    @action(detail=True, methods=["get"])
+    def related(self, request, pk=None):
         """
-        return super().retrieve(request, *args, **kwargs)
+        Frequently bought together: top-N из ProductCoPurchase
+        (индекс product, -count). ?limit= (по умолчанию 10, максимум 50).
+        """
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound()
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 50)
+        except ValueError:
+            raise ValidationError({"limit": "Expected an integer"})
+
+        if not Product.objects.filter(pk=pk, is_active=True).exists():
+            raise NotFound()
+
+        queryset = (
+            Product.objects
+            .filter(co_purchased_by__product_id=pk, is_active=True)
+            .order_by("-co_purchased_by__count", "id")
+        )
+        rows = ProductListProjection.project(queryset)[:limit]
+        return Response({"results": ProductListProjection.serialize(rows, request)})
 
 
 class CategoryViewSet(ReadOnlyModelViewSet):
+    """
+    Category tree API.
+    Дерево строится одним запросом и отдаётся из версионированного кэша
+    (см. CategoryTreeService), сериализатор используется только для схемы.
+    """
     queryset = (
         Category.objects
         .filter(is_active=True, parent__isnull=True)
-        .prefetch_related("children")
         .order_by("name")
     )
 
     serializer_class = CategorySerializer
 
-    @method_decorator(cache_page(300))
-    def dispatch(self, *args, **kwargs):
-        return super().dispatch(*args, **kwargs)
+    def list(self, request, *args, **kwargs):
+        key, entry = CategoryTreeService.get_tree_entry()
+
+        def build():
+            roots = entry["tree"]
+            page = self.paginate_queryset(roots)
+            if page is not None:
+                return self.get_paginated_response(page)
+            return Response(roots)
+
+        # версия дерева + параметры пагинации; 304 — без пагинации и рендера
+        return conditional_response(
+            request,
+            make_etag(key, entry["built_at"], request.get_full_path()),
+            entry["built_at"],
+            build,
+        )
+
+    @action(detail=True, methods=["get"])
+    def top(self, request, pk=None):
+        """
+        Bestsellers of the category and its descendants (Product.popularity).
+        ?limit= (по умолчанию 10, максимум 50).
+        """
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound()
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 50)
+        except ValueError:
+            raise ValidationError({"limit": "Expected an integer"})
+
+        def build():
+            path = (
+                Category.objects
+                .filter(pk=pk, is_active=True)
+                .values_list("path", flat=True)
+                .first()
+            )
+            if path is None:
+                raise NotFound()
+
+            queryset = (
+                Product.objects
+                .filter(category__path__startswith=path, is_active=True)
+                .order_by("-popularity", "id")
+            )
+            rows = list(ProductListProjection.project(queryset)[:limit])
+            data = {"results": ProductListProjection.serialize(rows, request)}
+            return Response(data), [product_tag(row["id"]) for row in rows]
+
+        # popularity пересчитывается командой, она сбрасывает тег catalog
+        return ProductResponseCache.cached_response(
+            request,
+            "category_top",
+            lambda: [CATALOG_TAG, category_tag(pk)],
+            build,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            pk = int(kwargs[self.lookup_field])
+        except (TypeError, ValueError):
+            raise NotFound()
+
+        key, entry = CategoryTreeService.get_tree_entry()
+        for node in entry["tree"]:
+            if node["id"] == pk:
+                return conditional_response(
+                    request,
+                    make_etag(key, entry["built_at"], pk),
+                    entry["built_at"],
+                    lambda: Response(node),
+                )
+        raise NotFound()
@@ -1,5 +1,14 @@
 # app_name/admin.py
 from django.contrib import admin
 from .models import Review
+from .services import ReviewStatsService
 
-admin.site.register(Review)
+
+@admin.register(Review)
+class ReviewAdmin(admin.ModelAdmin):
+
+    def delete_queryset(self, request, queryset):
+        # «удалить выбранные»: post_delete на каждый отзыв — в bulk()
+        # вместо UPDATE товара на отзыв один recompute по затронутым товарам
+        with ReviewStatsService.bulk():
+            super().delete_queryset(request, queryset)
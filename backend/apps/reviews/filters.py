@@ -0,0 +1,32 @@
+import django_filters
+from rest_framework import filters
+
+from .models import Review
+
+
+class ReviewFilter(django_filters.FilterSet):
+    # ?rating=5 — ровно 5★, ?min_rating=4 — «от 4★»
+    # (счётчики для обоих — в /reviews/summary/)
+    rating = django_filters.NumberFilter(field_name="rating")
+    min_rating = django_filters.NumberFilter(
+        field_name="rating",
+        lookup_expr="gte",
+    )
+
+    class Meta:
+        model = Review
+        fields = ["rating", "min_rating"]
+
+
+class ReviewOrderingFilter(filters.OrderingFilter):
+    """
+    ?ordering=rating / -rating дополняется created_at в том же направлении —
+    сортировка целиком идёт по индексу (product, rating, created_at).
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view) or [])
+        names = {f.lstrip("-") for f in ordering}
+        if ordering and ordering[-1].lstrip("-") == "rating" and "created_at" not in names:
+            ordering.append("-created_at" if ordering[-1].startswith("-") else "created_at")
+        return ordering
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.products.cache import invalidate_catalog
+from apps.reviews.services import ReviewStatsService
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized reviews_count, rating_sum and rating on products"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--product",
+            type=int,
+            action="append",
+            dest="product_ids",
+            help="Only this product id (can be repeated)",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("Reconciling review counters..."))
+
+        with transaction.atomic():
+            updated = ReviewStatsService.recompute(options["product_ids"])
+            # UPDATE мимо сигналов — сбрасываем кэш ответов каталога
+            invalidate_catalog()
+
+        self.stdout.write(self.style.SUCCESS(f"Products updated: {updated}"))
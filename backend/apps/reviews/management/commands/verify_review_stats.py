@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.products.cache import invalidate_catalog
+from apps.reviews.services import ReviewStatsService
+
+
+class Command(BaseCommand):
+    help = "Compare denormalized review counters on products with review aggregates"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--product",
+            type=int,
+            action="append",
+            dest="product_ids",
+            help="Only this product id (can be repeated)",
+        )
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Recompute counters for drifted products",
+        )
+        parser.add_argument(
+            "--show",
+            type=int,
+            default=20,
+            help="How many mismatches to print",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("Verifying review counters..."))
+
+        drift = list(ReviewStatsService.find_drift(options["product_ids"]))
+        for row in drift[:options["show"]]:
+            # только расходящиеся поля: stored/actual
+            mismatches = " ".join(
+                f"{name}={row[name]}/{row[f'actual_{name}']}"
+                for name in row
+                if name != "id"
+                and not name.startswith("actual_")
+                and row[name] != row[f"actual_{name}"]
+            )
+            self.stdout.write(f"product={row['id']} {mismatches}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("No drift"))
+            return
+
+        self.stdout.write(self.style.WARNING(f"Drifted products: {len(drift)}"))
+        if not options["fix"]:
+            return
+
+        with transaction.atomic():
+            updated = ReviewStatsService.recompute([row["id"] for row in drift])
+            # UPDATE мимо сигналов — сбрасываем кэш ответов каталога
+            invalidate_catalog()
+
+        self.stdout.write(self.style.SUCCESS(f"Products fixed: {updated}"))
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-17 18:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0014_product_stars'),
+        ('reviews', '0002_alter_review_rating_alter_review_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', 'created_at'], name='reviews_rev_product_847b15_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', 'rating', 'created_at'], name='reviews_rev_product_4e45d2_idx'),
+        ),
+    ]
@@ -22,3 +22,8 @@ class Review(models.Model):
 
     class Meta:
         unique_together = ('user', 'product')
+        indexes = [
+            # лента отзывов товара: ORDER BY created_at / rating, created_at
+            models.Index(fields=['product', 'created_at']),
+            models.Index(fields=['product', 'rating', 'created_at']),
+        ]
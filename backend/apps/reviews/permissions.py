@@ -1,5 +1,5 @@
 from rest_framework.permissions import BasePermission
-from apps.orders.models import OrderItem, Order
+from apps.orders.services import PurchaseService
 
 
 class HasPurchasedProduct(BasePermission):
@@ -18,14 +18,13 @@ class HasPurchasedProduct(BasePermission):
         if not request.user.is_authenticated:
             return False
 
-        # Для создания отзыва проверяем покупку
+        # Для создания отзыва проверяем покупку (кэш PurchasedProduct)
         if request.method == "POST":
-            product_id = view.kwargs.get("product_id")
-            return OrderItem.objects.filter(
-                order__user=request.user,
-                order__status__in=[Order.Status.DELIVERED, Order.Status.COMPLETED],
-                product_id=product_id,
-            ).exists()
+            try:
+                product_id = int(view.kwargs.get("product_id"))
+            except (TypeError, ValueError):
+                return False
+            return PurchaseService.has_purchased(request.user.id, product_id)
 
         return True
 
@@ -35,4 +34,5 @@ class HasPurchasedProduct(BasePermission):
             return True
 
         # Редактировать/удалять может только автор
-        return obj.user == request.user
+        # user_id — без загрузки автора
+        return obj.user_id == request.user.id
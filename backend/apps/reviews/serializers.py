@@ -4,10 +4,9 @@ from .models import Review
 
 
 class ReviewSerializer(serializers.ModelSerializer):
-    user_email = serializers.CharField(
-        source='user.email',
-        read_only=True
-    )
+    # аннотации get_queryset (JOIN одной-двух колонок вместо select_related)
+    user_email = serializers.SerializerMethodField()
+    user_name = serializers.SerializerMethodField()
 
     class Meta:
         model = Review
@@ -16,6 +15,34 @@ class ReviewSerializer(serializers.ModelSerializer):
             'rating',
             'text',
             'user_email',
+            'user_name',
             'created_at',
         )
-        read_only_fields = ('id', 'created_at', 'user_email', 'product')
+        read_only_fields = ('id', 'created_at', 'user_email', 'user_name', 'product')
+
+    def _author(self, obj, annotation, field):
+        # после create аннотаций нет — user уже в объекте (save(user=...))
+        if hasattr(obj, annotation):
+            return getattr(obj, annotation)
+        return getattr(obj.user, field)
+
+    def get_user_email(self, obj):
+        return self._author(obj, 'user_email', 'email')
+
+    def get_user_name(self, obj):
+        return self._author(obj, 'user_name', 'first_name')
+
+
+class RatingBucketSerializer(serializers.Serializer):
+    rating = serializers.IntegerField()
+    count = serializers.IntegerField()
+    count_at_least = serializers.IntegerField()
+    percent = serializers.IntegerField()
+
+
+class ReviewSummarySerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    reviews_count = serializers.IntegerField()
+    rating = serializers.DecimalField(max_digits=2, decimal_places=1)
+    # 5★ … 1★
+    distribution = RatingBucketSerializer(many=True)
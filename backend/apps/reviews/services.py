@@ -0,0 +1,221 @@
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db.models import (
+    Count, DecimalField, ExpressionWrapper, F, FloatField, OuterRef, Subquery, Sum, Value,
+)
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from apps.products.cache import invalidate_catalog
+from apps.products.models import Product
+from .models import Review
+
+_bulk = threading.local()
+
+
+def rating_expression(rating_sum, reviews_count):
+    """
+    round(rating_sum / reviews_count, 1) half-up, 0 — если отзывов нет.
+    """
+    # десятые целочисленно: (20·sum + count) // (2·count) — без float-ошибок
+    # округления на x.x5 и одинаково в SQLite и PostgreSQL
+    tenths = (rating_sum * 20 + reviews_count) / NullIf(reviews_count * 2, 0)
+    return Coalesce(
+        ExpressionWrapper(
+            Cast(tenths, FloatField()) / 10,
+            output_field=DecimalField(max_digits=2, decimal_places=1),
+        ),
+        Value(Decimal("0")),
+    )
+
+
+STARS = range(1, 6)
+
+
+def star_field(star):
+    return f"stars_{star}"
+
+
+def _per_product():
+    return (
+        Review.objects
+        .filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+    )
+
+
+def aggregate_expressions():
+    """
+    Коррелированные подзапросы: фактические счётчики товара по его отзывам.
+    """
+    per_product = _per_product()
+    expressions = {
+        "reviews_count": Coalesce(
+            Subquery(per_product.annotate(c=Count("id")).values("c")[:1]), Value(0)
+        ),
+        "rating_sum": Coalesce(
+            Subquery(per_product.annotate(s=Sum("rating")).values("s")[:1]), Value(0)
+        ),
+    }
+    for star in STARS:
+        expressions[star_field(star)] = Coalesce(
+            Subquery(
+                per_product.filter(rating=star).annotate(c=Count("id")).values("c")[:1]
+            ),
+            Value(0),
+        )
+    return expressions
+
+
+class ReviewStatsService:
+
+    @staticmethod
+    def recompute(product_ids=None):
+        """
+        Set-based пересчёт счётчиков отзывов: один UPDATE
+        с коррелированными подзапросами вместо цикла по товарам.
+        """
+        qs = Product.objects.all()
+        if product_ids is not None:
+            qs = qs.filter(pk__in=product_ids)
+
+        expressions = aggregate_expressions()
+        return qs.update(
+            rating=rating_expression(expressions["rating_sum"], expressions["reviews_count"]),
+            **expressions,
+        )
+
+    @staticmethod
+    def apply_delta(product_id, added=None, removed=None):
+        """
+        added / removed — оценка появившегося / ушедшего отзыва (правка = обе).
+        Сдвигает rating_sum / reviews_count / stars_N F()-дельтами
+        и пересчитывает rating из них же — один UPDATE строки товара,
+        без AVG по отзывам и save().
+        """
+        if ReviewStatsService.defer(product_id):
+            return 0
+
+        rating_delta = (added or 0) - (removed or 0)
+        count_delta = (added is not None) - (removed is not None)
+
+        qs = Product.objects.filter(pk=product_id)
+        if count_delta < 0:
+            qs = qs.filter(reviews_count__gte=-count_delta)
+
+        changes = {}
+        if removed is not None:
+            changes[star_field(removed)] = F(star_field(removed)) - 1
+        if added is not None:
+            # added == removed: -1 и +1 в одной колонке
+            changes[star_field(added)] = changes.get(star_field(added), F(star_field(added))) + 1
+
+        new_sum = F("rating_sum") + rating_delta
+        new_count = F("reviews_count") + count_delta
+        # rating первым: MySQL считает SET слева направо по уже новым значениям
+        return qs.update(
+            rating=rating_expression(new_sum, new_count),
+            rating_sum=new_sum,
+            reviews_count=new_count,
+            **changes,
+        )
+
+    @staticmethod
+    def summary(product_id):
+        """
+        Сводка отзывов товара — одна строка products_product, без чтения отзывов.
+        None — товара нет.
+        """
+        row = (
+            Product.objects
+            .filter(pk=product_id)
+            .values("id", "reviews_count", "rating", *(star_field(star) for star in STARS))
+            .first()
+        )
+        if row is None:
+            return None
+
+        total = row["reviews_count"]
+        distribution, at_least = [], 0
+        for star in reversed(STARS):
+            count = row[star_field(star)]
+            at_least += count
+            distribution.append({
+                "rating": star,
+                "count": count,
+                # для фильтра списка «от N★»
+                "count_at_least": at_least,
+                "percent": round(count * 100 / total) if total else 0,
+            })
+
+        return {
+            "product_id": row["id"],
+            "reviews_count": total,
+            "rating": row["rating"],
+            "distribution": distribution,
+        }
+
+    @staticmethod
+    def defer(product_id):
+        """
+        В режиме bulk() только запоминает товар; True — дельту применять не нужно.
+        """
+        product_ids = getattr(_bulk, "product_ids", None)
+        if product_ids is None:
+            return False
+        product_ids.add(product_id)
+        return True
+
+    @staticmethod
+    def in_bulk():
+        return getattr(_bulk, "product_ids", None) is not None
+
+    @classmethod
+    @contextmanager
+    def bulk(cls):
+        """
+        Импорт / массовые правки отзывов: сигналы не трогают товары
+        построчно, на выходе — один recompute по затронутым товарам.
+        Отдаёт множество id — туда же добавляют товары из bulk_create.
+        """
+        if cls.in_bulk():
+            # вложенный bulk — пересчитает внешний
+            yield _bulk.product_ids
+            return
+
+        _bulk.product_ids = set()
+        try:
+            yield _bulk.product_ids
+            product_ids = _bulk.product_ids
+        finally:
+            _bulk.product_ids = None
+
+        if product_ids:
+            cls.recompute(product_ids)
+            # UPDATE мимо сигналов — сбрасываем кэш ответов каталога
+            invalidate_catalog()
+
+    @staticmethod
+    def find_drift(product_ids=None):
+        """
+        Товары, у которых денормализованные счётчики расходятся
+        с агрегатами по отзывам.
+        """
+        expressions = aggregate_expressions()
+        qs = Product.objects.annotate(
+            **{f"actual_{name}": expr for name, expr in expressions.items()}
+        ).annotate(
+            actual_rating=rating_expression(F("actual_rating_sum"), F("actual_reviews_count")),
+        )
+        if product_ids is not None:
+            qs = qs.filter(pk__in=product_ids)
+
+        fields = [*expressions, "rating"]
+        return (
+            qs
+            .exclude(**{name: F(f"actual_{name}") for name in fields})
+            .order_by("id")
+            .values("id", *fields, *(f"actual_{name}" for name in fields))
+        )
@@ -1,17 +1,65 @@
-from django.db.models import Avg
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 
 from .models import Review
-from apps.products.models import Product
+from .services import ReviewStatsService
+from apps.products.cache import invalidate_product
 
 
+@receiver(post_init, sender=Review)
+def remember_loaded_rating(sender, instance, **kwargs):
+    # значения из БД — для дельты при правке отзыва (из __dict__: без
+    # догрузки отложенных полей при only())
+    if instance.pk:
+        instance._loaded_rating = instance.__dict__.get("rating")
+        instance._loaded_product_id = instance.__dict__.get("product_id")
+    else:
+        instance._loaded_rating = instance._loaded_product_id = None
+
+
+@receiver(post_save, sender=Review)
+def update_product_rating_on_save(sender, instance, created, **kwargs):
+    """
+    Счётчики товара — F()-дельтами: новый отзыв +1, правка оценки —
+    из старой корзины в новую, перенос — минус у старого товара.
+    """
+    old_rating = getattr(instance, "_loaded_rating", None)
+    old_product_id = getattr(instance, "_loaded_product_id", None)
+
+    if created:
+        ReviewStatsService.apply_delta(instance.product_id, added=instance.rating)
+    elif old_rating is None or old_product_id is None:
+        # старое значение неизвестно (отложенное поле) — честный пересчёт
+        if not ReviewStatsService.defer(instance.product_id):
+            ReviewStatsService.recompute([instance.product_id])
+    elif old_product_id != instance.product_id:
+        ReviewStatsService.apply_delta(old_product_id, removed=old_rating)
+        ReviewStatsService.apply_delta(instance.product_id, added=instance.rating)
+    elif old_rating != instance.rating:
+        ReviewStatsService.apply_delta(
+            instance.product_id, added=instance.rating, removed=old_rating
+        )
+
+    instance._loaded_rating = instance.rating
+    instance._loaded_product_id = instance.product_id
+
+
+@receiver(post_delete, sender=Review)
+def update_product_rating_on_delete(sender, instance, **kwargs):
+    # удаляется то, что лежит в БД: _loaded_rating, а не правка в памяти
+    rating = getattr(instance, "_loaded_rating", None)
+    product_id = getattr(instance, "_loaded_product_id", None) or instance.product_id
+    if rating is None:
+        if not ReviewStatsService.defer(product_id):
+            ReviewStatsService.recompute([product_id])
+        return
+    ReviewStatsService.apply_delta(product_id, removed=rating)
+
 
 @receiver([post_save, post_delete], sender=Review)
-def update_product_rating(sender, instance, **kwargs):
-    product = instance.product
-    avg = product.reviews.aggregate(
-        avg=Avg('rating')
-    )['avg'] or 0
-    product.rating = round(avg, 1)
-    product.save(update_fields=['rating'])
+def invalidate_product_cache(sender, instance, **kwargs):
+    # в bulk() кэш сбрасывается один раз на выходе
+    if ReviewStatsService.in_bulk():
+        return
+    # rating / reviews_count есть и в карточке, и в списке (сортировка по rating)
+    invalidate_product(instance.product_id, listing=True)
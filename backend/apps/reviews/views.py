@@ -1,40 +1,119 @@
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.filters import OrderingFilter
-from rest_framework.pagination import PageNumberPagination
-from django.db import IntegrityError
-from rest_framework.exceptions import ValidationError
+from django_filters.rest_framework import DjangoFilterBackend
+from django.db import IntegrityError, transaction
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from apps.orders.services import PurchaseService
+from apps.products.cache import ProductResponseCache
+from apps.products.pagination import KeysetPagination
+from django.db.models import F
+from .filters import ReviewFilter, ReviewOrderingFilter
 from .models import Review
-from .serializers import ReviewSerializer
+from .serializers import ReviewSerializer, ReviewSummarySerializer
 from .permissions import HasPurchasedProduct
+from .services import ReviewStatsService
 
 
-class ReviewPagination(PageNumberPagination):
+class ReviewPagination(KeysetPagination):
+    # курсор по (created_at | rating, created_at) + id — без OFFSET и COUNT(*)
     page_size = 10
-    page_size_query_param = 'page_size'
     max_page_size = 50
 
 
 class ReviewViewSet(ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [HasPurchasedProduct] #IsAuthenticated
-    filter_backends = [OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ReviewOrderingFilter]
+    filterset_class = ReviewFilter
     ordering_fields = ['created_at', 'rating']
     ordering = ['-created_at']
     pagination_class = ReviewPagination
 
     def get_queryset(self):
+        # вместо целой строки User — только то, что показывает отзыв
         return Review.objects.filter(
             product_id=self.kwargs['product_id']
-        ).select_related('user')
+        ).annotate(
+            user_email=F('user__email'),
+            user_name=F('user__first_name'),
+        )
+
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def summary(self, request, product_id=None):
+        """
+        Средняя оценка и распределение 5★ … 1★ (проценты и счётчики
+        для фильтра по оценке) — из счётчиков товара, одна строка.
+        """
+        try:
+            product_id = int(product_id)
+        except ValueError:
+            raise NotFound()
+
+        def build():
+            summary = ReviewStatsService.summary(product_id)
+            if summary is None:
+                raise NotFound()
+            return Response(ReviewSummarySerializer(summary).data), []
+
+        # сигналы отзывов сбрасывают тег товара
+        return ProductResponseCache.cached_response(
+            request,
+            "review_summary",
+            lambda: ProductResponseCache.detail_tags(product_id),
+            build,
+        )
+
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def eligibility(self, request, product_id=None):
+        """
+        Может ли текущий пользователь оставить отзыв: покупка — из кэша
+        PurchaseService, свой отзыв — по уникальному индексу (user, product).
+        """
+        try:
+            product_id = int(product_id)
+        except ValueError:
+            raise NotFound()
+
+        user = request.user
+        if not user.is_authenticated:
+            return Response({
+                "can_review": False,
+                "has_purchased": False,
+                "review_id": None,
+            })
+
+        has_purchased = PurchaseService.has_purchased(user.id, product_id)
+        review_id = (
+            Review.objects
+            .filter(user=user, product_id=product_id)
+            .values_list("id", flat=True)
+            .first()
+        )
+        return Response({
+            "can_review": has_purchased and review_id is None,
+            "has_purchased": has_purchased,
+            "review_id": review_id,
+        })
 
     def perform_create(self, serializer):
+        # отзыв и счётчики товара (signals) — в одной транзакции
         try:
-            serializer.save(
-                user=self.request.user,
-                product_id=self.kwargs['product_id']
-            )
+            with transaction.atomic():
+                serializer.save(
+                    user=self.request.user,
+                    product_id=self.kwargs['product_id']
+                )
         except IntegrityError:
             raise ValidationError(
                 {"подробнее": "Вы уже ознакомились с этим продуктом"}
-            )
\ No newline at end of file
+            )
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
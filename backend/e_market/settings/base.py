@@ -223,3 +223,21 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+
+# Full-text search товаров: None — выбор по типу БД (см. apps/products/search.py)
+PRODUCT_SEARCH_BACKEND = None
+
+# Производные изображений товаров: число процессов Pillow (0 — синхронно)
+PRODUCT_IMAGE_WORKERS = int(os.environ.get("PRODUCT_IMAGE_WORKERS", "2"))
+
+# Очередь удаления файлов картинок: True — разбирать сразу после коммита,
+# False — командой process_file_deletions (cron / worker)
+PRODUCT_FILE_CLEANUP_INLINE = False
+
+# Хранилище корзины: None — Cart / CartItem в БД;
+# "apps.cart.store.RedisCartStore" — hash в Redis, в БД пишет flush_carts (cron / worker)
+CART_STORE_BACKEND = None
+CART_STORE_REDIS_ALIAS = "default"
+# TTL корзины в кэше; вытесненная корзина подгружается из БД
+CART_STORE_TIMEOUT = 60 * 60 * 24 * 30
@@ -14,4 +14,7 @@ DATABASES = {
 
 
 
-SECRET_KEY = "unsafe-dev-key"
\ No newline at end of file
+SECRET_KEY = "unsafe-dev-key"
+
+PRODUCT_IMAGE_WORKERS = 0
+PRODUCT_FILE_CLEANUP_INLINE = True